@@ -3,6 +3,7 @@ Configuration management module for Keong-MAS application.
 Handles loading, saving, and accessing application settings.
 """
 import os
+import copy
 import json
 import logging
 
@@ -29,10 +30,14 @@ DEFAULT_CONFIG = {
         "save_mask": True,  # Default setting for saving mask files
         "jpg_export": {
             "enabled": False,
-            "quality": 90  # Default JPG quality (1-100)
+            "quality": 90,  # Default JPG quality (1-100)
+            "optimize": False,  # Extra Huffman pass: ~3-7% smaller files, slower encode
+            "progressive": True,
+            "backend": "pillow"  # "pillow" or "turbo" (optional simplejpeg package; baseline only, ignores optimize/progressive)
         },
         "model": {
-            "selected": "isnet-general-use"  # Default ONNX model name
+            "selected": "isnet-general-use",  # Default ONNX model name
+            "cpu_int8": False  # Run an INT8-quantized copy of the model on CPU (faster, slightly different masks)
         }
     },
     "image_cropping": {
@@ -49,40 +54,71 @@ DEFAULT_CONFIG = {
     }
 }
 
+# Resolved once at import; get_config_path() is hit by every get_value/set_value call
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json')
+
+# Parsed config shared by the getters, keyed on the file's (mtime, size) so edits made
+# outside the app are still picked up with a single stat per lookup
+_config_cache = {"key": None, "config": None}
+
 def get_config_path():
     """Get the absolute path to the config file"""
-    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.json')
+    return CONFIG_PATH
 
-def load_config():
+def _read_config():
     """
-    Load configuration from file or create with defaults if not exists
-    
-    Returns:
-        dict: Configuration dictionary
+    Return the parsed configuration, re-reading the file only when it changed.
+    The returned dict is shared; callers must not modify it.
     """
     config_path = get_config_path()
     
+    try:
+        stat = os.stat(config_path)
+    except FileNotFoundError:
+        stat = None
+    except Exception as e:
+        logger.error(f"Error loading configuration: {str(e)}")
+        return DEFAULT_CONFIG
+    
+    cache_key = (stat.st_mtime_ns, stat.st_size) if stat is not None else None
+    if cache_key is not None and _config_cache["key"] == cache_key:
+        return _config_cache["config"]
+    
     try:
         # Check if file exists
-        if os.path.exists(config_path):
+        if stat is not None:
             with open(config_path, 'r') as f:
                 config = json.load(f)
                 logger.debug(f"Configuration loaded from {config_path}")
                 
                 # Handle any missing keys by merging with defaults
-                merged_config = DEFAULT_CONFIG.copy()
+                merged_config = copy.deepcopy(DEFAULT_CONFIG)
                 deep_update(merged_config, config)
-                return merged_config
         else:
             # Create default config file
             with open(config_path, 'w') as f:
                 json.dump(DEFAULT_CONFIG, f, indent=4)
                 logger.debug(f"Created default configuration at {config_path}")
-            return DEFAULT_CONFIG.copy()
+            merged_config = copy.deepcopy(DEFAULT_CONFIG)
+            stat = os.stat(config_path)
+            cache_key = (stat.st_mtime_ns, stat.st_size)
     
     except Exception as e:
         logger.error(f"Error loading configuration: {str(e)}")
-        return DEFAULT_CONFIG.copy()
+        return DEFAULT_CONFIG
+    
+    _config_cache["key"] = cache_key
+    _config_cache["config"] = merged_config
+    return merged_config
+
+def load_config():
+    """
+    Load configuration from file or create with defaults if not exists
+    
+    Returns:
+        dict: Configuration dictionary (a private copy the caller may modify)
+    """
+    return copy.deepcopy(_read_config())
 
 def save_config(config):
     """
@@ -101,6 +137,8 @@ def save_config(config):
             json.dump(config, f, indent=4)
             # Use DEBUG level here to avoid cluttering stdout with frequent config saves
             logger.debug(f"Configuration saved to {config_path}")
+        # Force the next lookup to re-read, even if the write landed within the same mtime tick
+        _config_cache["key"] = None
         return True
     except Exception as e:
         logger.error(f"Error saving configuration: {str(e)}")
@@ -131,7 +169,10 @@ def get_value(path, default=None):
     Returns:
         Value at the specified path or default
     """
-    config = load_config()
+    return _lookup(_read_config(), path, default)
+
+def _lookup(config, path, default=None):
+    """Navigate a dot notation path in an already loaded config (see get_value)"""
     keys = path.split('.')
     
     # Navigate through the path
@@ -259,6 +300,18 @@ def get_solid_bg_margin():
     """Get the margin for solid backgrounds (using unified margin)"""
     return get_unified_margin()
 
+def get_solid_bg_settings():
+    """
+    Get (enabled, color, margin) for solid backgrounds from a single config lookup,
+    for callers that need all three for every image
+    """
+    config = _read_config()
+    return (
+        _lookup(config, 'solid_background.enabled', False),
+        _lookup(config, 'solid_background.color', '#FFFFFF'),
+        _lookup(config, 'image_processing.unified_margin', 10)
+    )
+
 def set_solid_bg_margin(margin):
     """Set the margin for solid backgrounds (using unified margin)"""
     return set_unified_margin(margin)
@@ -278,7 +331,7 @@ def get_save_mask_enabled():
         bool: True if mask files should be saved, False otherwise
     """
     try:
-        config = load_config()
+        config = _read_config()
         # Explicitly check if the value exists, otherwise return the default
         if "image_processing" in config and "save_mask" in config["image_processing"]:
             return config["image_processing"]["save_mask"]
@@ -344,6 +397,35 @@ def set_jpg_quality(quality):
     quality_int = max(1, min(100, int(quality)))
     return set_value('image_processing.jpg_export.quality', quality_int)
 
+def get_jpg_optimize():
+    """Get whether JPG export runs the extra Huffman optimization pass"""
+    return bool(get_value('image_processing.jpg_export.optimize', False))
+
+def set_jpg_optimize(enabled):
+    """Set whether JPG export runs the extra Huffman optimization pass"""
+    return set_value('image_processing.jpg_export.optimize', bool(enabled))
+
+def get_jpg_progressive():
+    """Get whether JPG export writes progressive JPEGs"""
+    return bool(get_value('image_processing.jpg_export.progressive', True))
+
+def set_jpg_progressive(enabled):
+    """Set whether JPG export writes progressive JPEGs"""
+    return set_value('image_processing.jpg_export.progressive', bool(enabled))
+
+def get_jpg_backend():
+    """Get the JPG encoder backend: 'pillow' or 'turbo' (simplejpeg)"""
+    backend = str(get_value('image_processing.jpg_export.backend', 'pillow')).lower()
+    return backend if backend in ('pillow', 'turbo') else 'pillow'
+
+def set_jpg_backend(backend):
+    """Set the JPG encoder backend: 'pillow' or 'turbo' (simplejpeg)"""
+    backend = str(backend).lower()
+    if backend not in ('pillow', 'turbo'):
+        logger.warning(f"Unknown JPG backend '{backend}', using 'pillow'")
+        backend = 'pillow'
+    return set_value('image_processing.jpg_export.backend', backend)
+
 def get_output_location():
     """Get the custom output location if set, otherwise None (defaults to PNG folder)"""
     return get_value('app.output_location', None)
@@ -353,6 +435,14 @@ def get_selected_model():
     """Get the selected ONNX model name"""
     return get_value('image_processing.model.selected', 'isnet-general-use')
 
+def get_model_cpu_int8_enabled():
+    """Get whether CPU inference uses an INT8-quantized copy of the model"""
+    return bool(get_value('image_processing.model.cpu_int8', False))
+
+def set_model_cpu_int8_enabled(enabled):
+    """Set whether CPU inference uses an INT8-quantized copy of the model"""
+    return set_value('image_processing.model.cpu_int8', bool(enabled))
+
 
 def set_selected_model(model_name):
     """Set the selected ONNX model name and log the result."""
@@ -416,3 +506,14 @@ def set_levels_white_point(value):
     """Set the white point for levels adjustment"""
     return set_value('image_processing.levels_adjustment.default.white_point', int(value))
 
+def set_levels_points(black, mid, white):
+    """Set black, mid and white point for levels adjustment with a single config write"""
+    config = load_config()
+    current = config
+    for key in ('image_processing', 'levels_adjustment', 'default'):
+        current = current.setdefault(key, {})
+    current['black_point'] = int(black)
+    current['mid_point'] = int(mid)
+    current['white_point'] = int(white)
+    return save_config(config)
+
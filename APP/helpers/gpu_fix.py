@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
 import sys
+import functools
 import traceback
 from typing import Dict, Any
 
@@ -49,22 +50,19 @@ def is_cuda_available():
     if not cuda_exists or not cudnn_exists:
         return False
     
-    # Try to find and load cuDNN DLL
-    try:
-        # Common cuDNN DLL names
-        cudnn_dll_names = ['cudnn64_9.dll', 'cudnn64_8.dll', 'cudnn_ops_infer64_9.dll', 'cudnn_ops_infer64_8.dll']
-        
-        for dll_name in cudnn_dll_names:
-            cudnn_dll = os.path.join(cudnn_bin, dll_name)
-            if os.path.exists(cudnn_dll):
-                try:
-                    import ctypes
-                    ctypes.windll.LoadLibrary(cudnn_dll)
-                    return True
-                except:
-                    continue
-    except:
-        pass
+    # Try to load a cuDNN DLL. The OS loader reports a missing file as OSError itself,
+    # so there is no separate exists() stat per candidate
+    import ctypes
+    # Common cuDNN DLL names
+    cudnn_dll_names = ['cudnn64_9.dll', 'cudnn64_8.dll', 'cudnn_ops_infer64_9.dll', 'cudnn_ops_infer64_8.dll']
+    
+    for dll_name in cudnn_dll_names:
+        try:
+            ctypes.WinDLL(os.path.join(cudnn_bin, dll_name))
+            return True
+        except (OSError, AttributeError):
+            # AttributeError: ctypes.WinDLL only exists on Windows
+            continue
     
     # If DLL loading failed, still return True if paths exist
     # (ONNX Runtime might handle DLL loading differently)
@@ -76,7 +74,15 @@ def has_nvidia_gpu():
     return any('nvidia' in name.lower() or 'rtx' in name.lower() or 'gtx' in name.lower() or 'quadro' in name.lower() for name in gpu_names)
 
 def get_gpu_names():
-    """Get list of GPU names in the system."""
+    """Get list of GPU names in the system.
+
+    The installed adapters don't change while the app runs, so the subprocess queries run
+    once per process; later calls (worker start, every image) get a copy of the answer.
+    """
+    return list(_query_gpu_names())
+
+@functools.lru_cache(maxsize=1)
+def _query_gpu_names() -> tuple:
     gpu_names = []
     
     try:
@@ -93,6 +99,11 @@ def get_gpu_names():
     except:
         pass
     
+    # Method 2 only when WMIC gave nothing (it is missing on newer Windows builds);
+    # starting PowerShell costs far more than the query itself
+    if gpu_names:
+        return tuple(gpu_names)
+    
     try:
         # Method 2: Use PowerShell to get GPU names
         import subprocess
@@ -107,7 +118,7 @@ def get_gpu_names():
     except:
         pass
     
-    return gpu_names
+    return tuple(gpu_names)
 
 def _add_dll_directory(path: str) -> bool:
     try:
@@ -128,7 +139,13 @@ def get_available_ort_providers() -> list:
 
     Ensures CUDA/cuDNN DLL directories are added to the process before importing ONNX Runtime so
     provider shared-libraries (e.g., the CUDA provider DLL) can be loaded successfully.
+    The probe runs once per process; later calls get a copy of the first answer.
     """
+    return list(_probe_ort_providers())
+
+
+@functools.lru_cache(maxsize=1)
+def _probe_ort_providers() -> tuple:
     try:
         # Ensure CUDA/cuDNN DLL directories are visible to this process before importing onnxruntime
         try:
@@ -145,13 +162,14 @@ def get_available_ort_providers() -> list:
 
         import onnxruntime as ort
         try:
-            return ort.get_available_providers()
+            return tuple(ort.get_available_providers())
         except Exception:
-            return []
+            return ()
     except Exception:
-        return []
+        return ()
 
 
+@functools.lru_cache(maxsize=1)
 def detect_best_provider() -> str:
     """Detect the best available hardware provider.
 
@@ -159,6 +177,8 @@ def detect_best_provider() -> str:
 
     This function attempts to validate candidates by creating a lightweight rembg session so that we
     don't pick a provider that is listed but fails to load at runtime due to missing DLLs.
+    The result is memoized: the worker asks for providers on every image, and each validation
+    builds a full ONNX Runtime session.
     """
     providers = get_available_ort_providers()
     priority = ['CUDAExecutionProvider', 'DmlExecutionProvider', 'ROCMExecutionProvider']
@@ -205,20 +225,77 @@ def get_provider_list() -> list:
     return [best]
 
 
+# CUDA EP tuning: HEURISTIC picks cuDNN conv algorithms without benchmarking every new input
+# shape (EXHAUSTIVE, the default, re-tunes for each differently sized image), and the arena
+# grows by exactly what is requested instead of doubling
+CUDA_PROVIDER_OPTIONS = {
+    'cudnn_conv_algo_search': 'HEURISTIC',
+    'arena_extend_strategy': 'kSameAsRequested',
+}
+
+
+def _attach_provider_options(providers: list) -> list:
+    return [(p, dict(CUDA_PROVIDER_OPTIONS)) if p == 'CUDAExecutionProvider' else p for p in providers]
+
+
+def with_provider_options(providers: list) -> list:
+    """Attach provider options (as ONNX Runtime (name, options) tuples) for session creation.
+
+    The options are only attached when the startup session check created a session with
+    them; older rembg releases filter providers by name and silently drop tuples, in which
+    case the plain provider names are returned.
+    """
+    if 'CUDAExecutionProvider' not in providers:
+        return list(providers)
+    _try_create_rembg_cuda_session()
+    return _attach_provider_options(providers) if _provider_options_ok else list(providers)
+
+
+# Cleared by _try_create_rembg_cuda_session when a session with provider options fails or
+# ends up without the requested provider
+_provider_options_ok = True
+
+
+def _session_providers(sess):
+    """Providers of a rembg session's ORT session, or None when they cannot be inspected."""
+    return getattr(getattr(sess, '_sess', None), 'get_providers', lambda: None)()
+
+
+@functools.lru_cache(maxsize=1)
 def _try_create_rembg_cuda_session() -> tuple[bool, str]:
+    global _provider_options_ok
     try:
         # Try to create a session using the best available provider (if any)
         providers = get_provider_list()
         import rembg
+
+        def _create(provs):
+            try:
+                return rembg.new_session('isnet-general-use', providers=provs) if provs else rembg.new_session('isnet-general-use')
+            except TypeError:
+                return rembg.new_session('isnet-general-use')
+
+        # Check the exact providers (with options) the worker will pass; fall back to plain names
+        sess = None
+        note = ''
+        optioned = _attach_provider_options(providers)
+        if optioned != providers:
+            try:
+                sess = _create(optioned)
+                provs = _session_providers(sess)
+                if provs is not None and providers[0] not in provs:
+                    raise RuntimeError(f'provider options dropped (providers={provs})')
+            except Exception as e:
+                note = f'; provider options disabled: {e}'
+                _provider_options_ok = False
+                sess = None
+        if sess is None:
+            sess = _create(providers)
         try:
-            sess = rembg.new_session('isnet-general-use', providers=providers) if providers else rembg.new_session('isnet-general-use')
-        except TypeError:
-            sess = rembg.new_session('isnet-general-use')
-        try:
-            provs = getattr(sess._sess, 'get_providers', lambda: None)()
-            return ((providers == [] and 'CPUExecutionProvider' in (provs or [])) or (providers and providers[0] in (provs or [])), f'providers={provs}')
+            provs = _session_providers(sess)
+            return ((providers == [] and 'CPUExecutionProvider' in (provs or [])) or (providers and providers[0] in (provs or [])), f'providers={provs}{note}')
         except Exception:
-            return True, 'session created (could not inspect providers)'
+            return True, f'session created (could not inspect providers){note}'
     except Exception as e:
         return False, traceback.format_exc()
 
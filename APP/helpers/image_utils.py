@@ -1,9 +1,27 @@
 import os
+import io
 import json
+import functools
+import logging
 import numpy as np
 from PIL import Image
 
-# Load config from JSON file
+# OpenCV is optional; when present it is used for SIMD-accelerated thresholding
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("ImageUtils")
+
+# Project root and config file location, resolved once at import
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_PATH = os.path.join(BASE_DIR, 'config.json')
+
+# Load config from JSON file (parsed once per process)
+@functools.lru_cache(maxsize=1)
 def load_config():
     """
     Loads the configuration from config.json file
@@ -12,8 +30,7 @@ def load_config():
         dict: Configuration values or default values if file not found
     """
     try:
-        config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.json')
-        with open(config_path, 'r') as f:
+        with open(CONFIG_PATH, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Warning: Could not load config.json: {e}")
@@ -35,6 +52,15 @@ def load_config():
             }
         }
 
+# Formats our pipeline reads (rembg outputs, masks and user images); passing them to
+# Image.open skips probing every registered Pillow plugin
+PIPELINE_IMAGE_FORMATS = ["PNG", "JPEG", "WEBP"]
+
+# zlib levels for PNG saves: intermediates are rewritten or deleted within the same run, so
+# favour encode speed; final outputs trade a little size for much less CPU than the default 6
+INTERMEDIATE_PNG_COMPRESS_LEVEL = 1
+FINAL_PNG_COMPRESS_LEVEL = 3
+
 # Load config values
 config = load_config()
 levels_config = config.get("image_processing", {}).get("levels_adjustment", {})
@@ -65,6 +91,109 @@ def get_levels_config(use_recommended=True):
     else:
         return (DEFAULT_BLACK_POINT, DEFAULT_MID_POINT, DEFAULT_WHITE_POINT)
 
+def save_png_atomic(image, output_path, **save_kwargs):
+    """
+    Saves an image as PNG without ever leaving a half-written file at output_path.
+    The image is encoded into memory first, written to a temporary sibling file and
+    then moved into place with os.replace (atomic on the same filesystem).
+    
+    Args:
+        image (PIL.Image): Image to save
+        output_path (str): Final destination path
+        **save_kwargs: Extra options passed to Image.save (e.g. compress_level)
+    """
+    buf = io.BytesIO()
+    image.save(buf, format="PNG", **save_kwargs)
+    
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(buf.getbuffer())
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _open_image_and_mask(image_path, mask_path):
+    """
+    Opens the main image and its mask, letting Image.open do the existence check
+    instead of a separate stat per file.
+    
+    Returns:
+        tuple: (main_image, mask_image) as lazily-loaded PIL images
+        
+    Raises:
+        FileNotFoundError: With the same messages as the former explicit checks
+    """
+    try:
+        main_image = Image.open(image_path, formats=PIPELINE_IMAGE_FORMATS)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    try:
+        mask_image = Image.open(mask_path, formats=PIPELINE_IMAGE_FORMATS)
+    except FileNotFoundError:
+        main_image.close()
+        raise FileNotFoundError(f"Mask file not found: {mask_path}")
+    # Only the luminance is used; for JPEG masks this decodes the Y plane alone
+    # (draft is a no-op for PNG/WEBP, which stay lazy until the pixels are read)
+    mask_image.draft("L", mask_image.size)
+    return main_image, mask_image
+
+def _ensure_mode(image, mode):
+    """
+    Returns the image in the requested mode, converting only when needed
+    (Image.convert always allocates and copies, even for a same-mode call).
+    """
+    return image if image.mode == mode else image.convert(mode)
+
+def _resize_mask(mask_image, target_size, fast=False):
+    """
+    Resizes a mask to target_size (width, height) and returns it in L mode.
+    With OpenCV available, large downscales (2x or more) use INTER_AREA, which is both
+    faster and cleaner than Lanczos there; other cases use Lanczos (or bilinear when
+    ``fast`` is set because the result is about to be thresholded). Without OpenCV the
+    equivalent Pillow filters are used.
+    """
+    if cv2 is None:
+        resample = Image.BILINEAR if fast else Image.LANCZOS
+        return _ensure_mode(mask_image.resize(target_size, resample), "L")
+    
+    mask_array = np.asarray(_ensure_mode(mask_image, "L"), dtype=np.uint8)
+    height, width = mask_array.shape
+    target_width, target_height = target_size
+    if target_width * 2 <= width or target_height * 2 <= height:
+        interpolation = cv2.INTER_AREA
+    elif fast:
+        interpolation = cv2.INTER_LINEAR
+    else:
+        interpolation = cv2.INTER_LANCZOS4
+    return Image.fromarray(cv2.resize(mask_array, target_size, interpolation=interpolation))
+
+def _assemble_rgba(image, alpha_image):
+    """
+    Builds an RGBA image from the colour data of ``image`` and a grayscale alpha in one
+    NumPy buffer, instead of split()/merge() or paste()/putalpha() which copy every
+    channel separately. An RGBA source (rembg output) is copied once and its alpha slot
+    overwritten, skipping the RGBA -> RGB conversion.
+    
+    Args:
+        image (PIL.Image): Colour source (any mode; alpha is discarded)
+        alpha_image (PIL.Image): Same-sized image in L mode
+        
+    Returns:
+        PIL.Image: RGBA image
+    """
+    if image.mode == "RGBA":
+        rgba_array = np.array(image, dtype=np.uint8)
+    else:
+        rgb = _ensure_mode(image, "RGB")
+        rgb_array = np.asarray(rgb, dtype=np.uint8)
+        rgba_array = np.empty(rgb_array.shape[:2] + (4,), dtype=np.uint8)
+        rgba_array[..., :3] = rgb_array
+    rgba_array[..., 3] = np.asarray(alpha_image, dtype=np.uint8)
+    return Image.fromarray(rgba_array)
+
 def create_binary_mask(mask_image, threshold=128):
     """
     Creates a binary mask (only pure black or pure white) for extreme edge control.
@@ -80,21 +209,23 @@ def create_binary_mask(mask_image, threshold=128):
         PIL.Image: The binary mask image
     """
       # Ensure mask is in grayscale mode
-    mask = mask_image.convert("L")
-    
-    # Convert to numpy array for faster processing
-    mask_array = np.array(mask, dtype=np.uint8)
-    
-    # Original min/max (kept for potential debugging, printing removed)
-    
-    # Create binary mask - all values below threshold become 0, all above become 255
-    binary_mask = np.zeros_like(mask_array)
-    binary_mask[mask_array > threshold] = 255
+    mask = _ensure_mode(mask_image, "L")
     
-    # Convert back to PIL Image
-    binary_mask_img = Image.fromarray(binary_mask)
+    if cv2 is not None:
+        # Single SIMD pass, no boolean intermediate (same "> threshold" semantics)
+        mask_array = np.asarray(mask, dtype=np.uint8)
+        _, binary_mask = cv2.threshold(mask_array, threshold, 255, cv2.THRESH_BINARY)
+        return Image.fromarray(binary_mask)
     
-    return binary_mask_img
+    # Create binary mask - all values below threshold become 0, all above become 255.
+    # Image.point applies the 256-entry table in Pillow's C loop without a NumPy roundtrip
+    return mask.point(_binary_lut(threshold))
+
+@functools.lru_cache(maxsize=32)
+def _binary_lut(threshold):
+    """Returns the 256-byte point() table for create_binary_mask's "> threshold" cut."""
+    cut = min(255, max(-1, int(threshold)))
+    return bytes(cut + 1) + b"\xff" * (255 - cut)
 
 def combine_with_mask(image_path, mask_path, output_suffix="_transparent"):
     """
@@ -109,8 +240,8 @@ def combine_with_mask(image_path, mask_path, output_suffix="_transparent"):
         str: Path to the generated transparent image
     """
     try:        # Load the main image and the mask
-        main_image = Image.open(image_path)
-        mask_image = Image.open(mask_path)
+        main_image = Image.open(image_path, formats=PIPELINE_IMAGE_FORMATS)
+        mask_image = Image.open(mask_path, formats=PIPELINE_IMAGE_FORMATS)
         
         # Debug ukuran gambar
         main_size = main_image.size
@@ -121,20 +252,14 @@ def combine_with_mask(image_path, mask_path, output_suffix="_transparent"):
         # Pastikan mask dan gambar utama memiliki ukuran yang sama
         if main_size != mask_size:
             print(f"PERINGATAN: Ukuran gambar dan mask berbeda! Menyesuaikan mask...")
-            mask_image = mask_image.resize(main_size, Image.LANCZOS)
+            mask_image = _resize_mask(mask_image, main_size)
         
         # Convert mask to grayscale if it's not already
-        mask = mask_image.convert("L")
-        
-        # Create a new RGBA image
-        result = Image.new("RGBA", main_image.size, (0, 0, 0, 0))
-        
-        # Copy the RGB data from the main image
-        result.paste(main_image.convert("RGB"), (0, 0))
+        mask = _ensure_mode(mask_image, "L")
         
         # Use the mask as the alpha channel (where white in the mask = 100% opacity)
         # This will override the alpha channel from the main image
-        result.putalpha(mask)
+        result = _assemble_rgba(main_image, mask)
         
         # Create output path
         output_dir = os.path.dirname(image_path)
@@ -142,7 +267,7 @@ def combine_with_mask(image_path, mask_path, output_suffix="_transparent"):
         output_path = os.path.join(output_dir, f"{file_name}{output_suffix}.png")
         
         # Save the resulting image
-        result.save(output_path)
+        save_png_atomic(result, output_path, compress_level=FINAL_PNG_COMPRESS_LEVEL)
         
         return output_path
         
@@ -167,14 +292,8 @@ def enhance_transparency(image_path, mask_path, output_suffix="_enhanced"):
 
     
     try:
-        # Verify files exist
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
-        if not os.path.exists(mask_path):
-            raise FileNotFoundError(f"Mask file not found: {mask_path}")
-              # Load the main image and the mask
-        main_image = Image.open(image_path)
-        mask_image = Image.open(mask_path)
+        # Load the main image and the mask (Image.open raises if a file is missing)
+        main_image, mask_image = _open_image_and_mask(image_path, mask_path)
         
         # Debug ukuran gambar
         main_size = main_image.size
@@ -185,30 +304,16 @@ def enhance_transparency(image_path, mask_path, output_suffix="_enhanced"):
         # Pastikan mask dan gambar utama memiliki ukuran yang sama
         if main_size != mask_size:
             print(f"PERINGATAN: Ukuran gambar dan mask berbeda! Menyesuaikan mask...")
-            mask_image = mask_image.resize(main_size, Image.LANCZOS)
+            mask_image = _resize_mask(mask_image, main_size)
         
         # Convert mask to grayscale if it's not already
-        mask = mask_image.convert("L")
-        
-        # Import numpy untuk operasi array
-        import numpy as np
-        
-        # Mask min/max debug printing removed
+        mask = _ensure_mode(mask_image, "L")
         
         # Pastikan mask tidak terbalik: 255 (putih) harus mewakili area yang ingin dipertahankan
         # rembg mask: putih = objek, hitam = background, ini sudah benar
         
-        # Ambil komponen RGB dari gambar asli
-        rgb = main_image.convert("RGB")
-        r, g, b = rgb.split()
-        
-        # Gunakan mask langsung sebagai alpha channel
-        new_alpha = mask
-        
-        # Alpha min/max debug printing removed
-        
-        # Merge the channels back together
-        result = Image.merge("RGBA", (r, g, b, new_alpha))
+        # Ambil komponen RGB dari gambar asli dan gunakan mask langsung sebagai alpha channel
+        result = _assemble_rgba(main_image, mask)
         
         # Create output path
         output_dir = os.path.dirname(image_path)
@@ -216,7 +321,7 @@ def enhance_transparency(image_path, mask_path, output_suffix="_enhanced"):
         output_path = os.path.join(output_dir, f"{file_name}{output_suffix}.png")
         
         # Save the resulting image
-        result.save(output_path)
+        save_png_atomic(result, output_path, compress_level=FINAL_PNG_COMPRESS_LEVEL)
         
         return output_path
         
@@ -225,11 +330,14 @@ def enhance_transparency(image_path, mask_path, output_suffix="_enhanced"):
         return None
 
 
-def apply_levels_to_mask(mask_image, black_point=DEFAULT_BLACK_POINT, mid_point=DEFAULT_MID_POINT, white_point=DEFAULT_WHITE_POINT):
+def apply_levels_to_mask(mask_image, black_point=DEFAULT_BLACK_POINT, mid_point=DEFAULT_MID_POINT, white_point=DEFAULT_WHITE_POINT, lut=None):
     """Public wrapper for levels adjustment. Delegates to the internal implementation so
     preview and real processing share identical math.
+
+    If ``lut`` (from ``_levels_lut_bytes`` or ``_build_levels_lut``) is given it is used
+    instead of looking up the table for the given points.
     """
-    return _apply_levels_to_mask_impl(mask_image, black_point, mid_point, white_point)
+    return _apply_levels_to_mask_impl(mask_image, black_point, mid_point, white_point, lut=lut)
 
 
 def cleanup_original_temp_files(original_transparent_path, original_mask_path):
@@ -261,69 +369,87 @@ def cleanup_temp_files(original_transparent_path, original_mask_path, adjusted_m
 
 import math
 
-def _apply_levels_to_mask_impl(mask_image, black_point, mid_point, white_point):
-    """Internal implementation of levels adjustment used by public wrapper.
+@functools.lru_cache(maxsize=32)
+def _build_levels_lut(black_point, mid_point, white_point):
+    """Build a 256-entry uint8 lookup table for the levels curve.
 
-    Uses the original Photoshop-like approach (clip, normalize to 0-1, apply simple gamma mapping
-    using a piecewise formula where midpoint <128 increases gamma and midpoint>128 reduces gamma).
-    This matches the original function that was present before and preserves expected behavior.
+    Uses the original Photoshop-like math (clip, normalize to 0-1, piecewise gamma from the
+    midpoint, scale back to 0-255) evaluated once per possible input value. Memoized because
+    every image in a run uses the same slider settings; the returned array is read-only.
     """
-    import numpy as np
-    from PIL import Image, ImageOps
-
-    # Ensure mask is in grayscale mode and convert to float array
-    if isinstance(mask_image, str):
-        if not os.path.exists(mask_image):
-            raise FileNotFoundError(f"Mask file not found: {mask_image}")
-        mask = Image.open(mask_image).convert('L')
-    else:
-        mask = mask_image.convert('L')
-
-    mask_array = np.array(mask, dtype=np.float32)
-
-    # Original range computation kept for internal use (printing removed)
-    try:
-        original_min = np.min(mask_array)
-        original_max = np.max(mask_array)
-    except Exception:
-        original_min = 0.0
-        original_max = 255.0
-
+    lut = np.arange(256, dtype=np.float32)
     input_black = float(black_point)
     input_white = float(white_point)
 
+    lut = np.clip(lut, input_black, input_white)
+    lut = (lut - input_black) / max(1.0, (input_white - input_black))
 
-
-    # Clip and normalize
-    mask_array = np.clip(mask_array, input_black, input_white)
-    mask_array = (mask_array - input_black) / max(1.0, (input_white - input_black))
-
-    # Apply simple piecewise gamma mapping based on midpoint
     if mid_point != 128:
-        gamma = 1.0
         if mid_point < 128:
             gamma = 1.0 + (128.0 - mid_point) / 128.0
         else:
             gamma = 128.0 / float(mid_point)
-        mask_array = np.power(mask_array, gamma)
+        # Skip the transcendental pass when gamma is effectively 1 (e.g. fractional midpoints)
+        if abs(gamma - 1.0) > 1e-6:
+            np.power(lut, gamma, out=lut)
 
-    # Scale back to 0-255 and clip
-    mask_array = mask_array * 255.0
-    mask_array = np.clip(mask_array, 0, 255).astype(np.uint8)
+    lut = lut * 255.0
+    lut = np.clip(lut, 0, 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
 
-    try:
-        new_min = np.min(mask_array)
-        new_max = np.max(mask_array)
-    except Exception:
-        new_min = 0
-        new_max = 255
+@functools.lru_cache(maxsize=32)
+def _levels_lut_bytes(black_point, mid_point, white_point):
+    """The levels table as an immutable 256-byte string, ready for Image.point."""
+    return _build_levels_lut(black_point, mid_point, white_point).tobytes()
+
+def _apply_levels_to_mask_impl(mask_image, black_point, mid_point, white_point, lut=None):
+    """Internal implementation of levels adjustment used by public wrapper.
 
-    return Image.fromarray(mask_array)
+    Uses the original Photoshop-like approach (clip, normalize to 0-1, apply simple gamma mapping
+    using a piecewise formula where midpoint <128 increases gamma and midpoint>128 reduces gamma).
+    The curve is precomputed as a 256-entry table and applied with Image.point, so the
+    per-pixel work is a single uint8 lookup inside Pillow with no NumPy round trip.
+    """
+    # Ensure mask is in grayscale mode and convert to uint8 array
+    if isinstance(mask_image, str):
+        try:
+            with Image.open(mask_image, formats=PIPELINE_IMAGE_FORMATS) as opened_mask:
+                opened_mask.draft("L", opened_mask.size)
+                mask = _ensure_mode(opened_mask, 'L')
+                mask.load()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Mask file not found: {mask_image}")
+    else:
+        mask = _ensure_mode(mask_image, 'L')
+
+    # Untouched sliders: the curve is the identity, so skip the table and the gather
+    if lut is None and (black_point, mid_point, white_point) == (0, 128, 255):
+        return mask
+
+    # Every mask is reduced to 8-bit above, so the 256-entry table covers all inputs and
+    # there is no per-pixel float/pow kernel left to accelerate (e.g. with a JIT)
+    if lut is None:
+        lut = _levels_lut_bytes(black_point, mid_point, white_point)
+    elif isinstance(lut, np.ndarray):
+        lut = lut.tobytes()
+
+    adjusted_mask = mask.point(lut)
+
+    # Range reductions are full passes over the mask, so only run them when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        mask_min, mask_max = mask.getextrema()
+        adjusted_min, adjusted_max = adjusted_mask.getextrema()
+        logger.debug(f"Levels {black_point}/{mid_point}/{white_point}: mask range "
+                     f"{mask_min}-{mask_max} -> {adjusted_min}-{adjusted_max}")
+
+    return adjusted_mask
 
 
 def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_transparent", 
                                    black_point=DEFAULT_BLACK_POINT, mid_point=DEFAULT_MID_POINT, white_point=DEFAULT_WHITE_POINT, 
-                                   save_adjusted_mask=True, cleanup_temp_files_after=True, save_mask=False):
+                                   save_adjusted_mask=False, cleanup_temp_files_after=True, save_mask=False,
+                                   return_image=False):
     """
     Takes a transparent PNG image and refines its alpha channel using the mask
     with levels adjustment to control feathering.
@@ -339,12 +465,17 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
                         Default 128 = no change to midtones
         white_point (int): The white point slider (0-255) - lower values make more pixels opaque
                           Default 255 = no change to highlights
-        save_adjusted_mask (bool): Whether to save the adjusted mask as a separate file
+        save_adjusted_mask (bool): Whether to save the adjusted mask as a separate file. Off by
+                          default; callers that crop or keep masks opt in. When off, the
+                          returned adjusted_mask_path is None
         cleanup_temp_files_after (bool): Whether to remove temporary files after processing
         save_mask (bool): Whether to keep the adjusted mask file after processing (deprecated - now handled by cleanup manager)
+        return_image (bool): Also return the in-memory RGBA result so later steps (JPG export)
+                          can reuse it instead of decoding the PNG again
         
     Returns:
-        str: Path to the generated enhanced transparent image
+        tuple: (output_path, adjusted_mask_path), or (output_path, adjusted_mask_path, image)
+               when return_image is True; None values on error
     """
     print(f"Memproses enhance_transparency_with_levels:")
     print(f"- Image path: {image_path}")
@@ -356,16 +487,11 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
     from APP.helpers.cleanup_manager import cleanup_original_temp_files, register_file_in_use, intelligent_cleanup_after_image_utils
     
     adjusted_mask_path = None
+    opened_images = ()
     try:
-        # Verify files exist
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
-        if not os.path.exists(mask_path):
-            raise FileNotFoundError(f"Mask file not found: {mask_path}")
-            
-        # Load the main image and the mask
-        main_image = Image.open(image_path)
-        mask_image = Image.open(mask_path)
+        # Load the main image and the mask (Image.open raises if a file is missing)
+        main_image, mask_image = _open_image_and_mask(image_path, mask_path)
+        opened_images = (main_image, mask_image)
         
         # Debug ukuran gambar
         main_size = main_image.size
@@ -373,13 +499,14 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
         print(f"Ukuran gambar utama: {main_size[0]}x{main_size[1]}")
         print(f"Ukuran mask: {mask_size[0]}x{mask_size[1]}")
         
+        # Detect if extreme settings are being used
+        using_extreme_settings = (white_point < 10) or (black_point > 240) or (mid_point < 10)
+        
         # Pastikan mask dan gambar utama memiliki ukuran yang sama
         if main_size != mask_size:
             print(f"PERINGATAN: Ukuran gambar dan mask berbeda! Menyesuaikan mask...")
-            mask_image = mask_image.resize(main_size, Image.LANCZOS)
-            
-        # Detect if extreme settings are being used
-        using_extreme_settings = (white_point < 10) or (black_point > 240) or (mid_point < 10)
+            # The binary threshold discards LANCZOS detail, so use the cheaper filter there
+            mask_image = _resize_mask(mask_image, main_size, fast=using_extreme_settings)
         
         if using_extreme_settings:
             print("Detecting extreme levels settings, using binary mask...")
@@ -427,7 +554,7 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
         # Save adjusted mask if requested - ensure it gets saved to PNG folder
         if save_adjusted_mask:
             try:
-                adjusted_mask.save(adjusted_mask_path)
+                save_png_atomic(adjusted_mask, adjusted_mask_path, compress_level=INTERMEDIATE_PNG_COMPRESS_LEVEL)
                 print(f"Adjusted mask disimpan ke {adjusted_mask_path}")
                 
                 # Register the adjusted mask as in use for future operations
@@ -435,19 +562,14 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
                 
             except Exception as mask_error:
                 print(f"Error saving adjusted mask: {str(mask_error)}")
+        else:
+            adjusted_mask_path = None
         
-        # Ambil komponen RGB dari gambar asli
-        rgb = main_image.convert("RGB")
-        r, g, b = rgb.split()
-        
-        # Use adjusted mask as alpha channel
-        new_alpha = adjusted_mask
-        
-        # Merge the channels back together
-        result = Image.merge("RGBA", (r, g, b, new_alpha))
+        # Ambil komponen RGB dari gambar asli, use adjusted mask as alpha channel
+        result = _assemble_rgba(main_image, adjusted_mask)
         
         # Save the resulting image
-        result.save(output_path)
+        save_png_atomic(result, output_path, compress_level=FINAL_PNG_COMPRESS_LEVEL)
         
         # Clean up original temporary files if requested
         if cleanup_temp_files_after:
@@ -464,11 +586,19 @@ def enhance_transparency_with_levels(image_path, mask_path, output_suffix="_tran
         intelligent_cleanup_after_image_utils(output_path)
         
         # Return both output path and adjusted mask path (for auto crop)
+        if return_image:
+            return output_path, adjusted_mask_path, result
         return output_path, adjusted_mask_path
         
     except Exception as e:
         print(f"Error enhancing transparency with levels: {str(e)}")
+        if return_image:
+            return None, None, None
         return None, None
+    finally:
+        # Release the file handles right away so batch runs don't pile up open files
+        for opened_image in opened_images:
+            opened_image.close()
 
 # Add this new function to help understand and handle rembg alpha matting errors
 def explain_alpha_matting_error(error_message):
@@ -518,14 +648,18 @@ def recommend_alpha_matting_params(image):
         dict: Recommended alpha matting parameters
     """
     # Convert to grayscale for analysis
-    grayscale = image.convert("L")
-    np_img = np.array(grayscale)
+    grayscale = _ensure_mode(image, "L")
+    np_img = np.asarray(grayscale, dtype=np.uint8)
     
-    # Get image statistics
-    img_min = np.min(np_img)
-    img_max = np.max(np_img)
-    img_mean = np.mean(np_img)
-    img_std = np.std(np_img)
+    # Get image statistics from a single histogram pass; with only 256 possible values
+    # min/max/mean/std follow exactly from the bin counts
+    histogram = np.bincount(np_img.ravel(), minlength=256)
+    levels = np.nonzero(histogram)[0]
+    img_min = int(levels[0])
+    img_max = int(levels[-1])
+    values = np.arange(256, dtype=np.float64)
+    img_mean = float(np.dot(histogram, values) / np_img.size)
+    img_std = float(np.sqrt(max(0.0, np.dot(histogram, values * values) / np_img.size - img_mean * img_mean)))
     
     # Calculate contrast ratio
     contrast_ratio = (img_max - img_min) / 255
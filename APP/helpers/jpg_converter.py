@@ -6,16 +6,112 @@ import os
 import logging
 import time
 import re
+import functools
+import numpy as np
 from PIL import Image
 
-from APP.helpers.config_manager import get_jpg_export_enabled, get_jpg_quality, get_solid_bg_enabled
+from APP.helpers.config_manager import get_jpg_export_enabled, get_jpg_quality, get_jpg_optimize, get_jpg_progressive, get_jpg_backend, get_solid_bg_enabled
 from APP.helpers.cleanup_manager import intelligent_cleanup_after_all_operations
 
+# Optional libjpeg-turbo encoder, used when image_processing.jpg_export.backend is "turbo"
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("JPGConverter")
 
-def convert_to_jpg(image_path, output_path=None, quality=None):
+# Output suffixes written by the earlier pipeline steps, and the timestamp that follows them
+SOLID_BG_SUFFIX = "_solid_background"
+TRANSPARENT_SUFFIX = "_transparent"
+SUFFIX_TIMESTAMP_RE = re.compile(r'_(transparent|solid_background)_(\d+)')
+
+def composite_over_white(img):
+    """
+    Flattens an image with transparency onto a white background.
+    Computes out = (rgb * a + 255 * (255 - a)) / 255 in a single uint16 NumPy pass,
+    rounded like Pillow's paste, instead of Image.new + split + paste(mask=...).
+    
+    Args:
+        img (PIL.Image): Image in RGBA, LA or P (with transparency) mode
+        
+    Returns:
+        PIL.Image: RGB image
+    """
+    rgba = np.asarray(img if img.mode == 'RGBA' else img.convert('RGBA'), dtype=np.uint8)
+    out = rgba[..., :3].astype(np.uint16)
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    
+    # White contribution, computed in place on the single-channel alpha buffer
+    out *= alpha
+    np.subtract(255, alpha, out=alpha)
+    alpha *= 255
+    alpha += 127
+    out += alpha
+    out //= 255
+    return Image.fromarray(out.astype(np.uint8))
+
+@functools.lru_cache(maxsize=1)
+def _warn_turbo_unavailable():
+    """Logs (once per process) that the turbo backend is configured but unavailable."""
+    logger.warning("JPG backend 'turbo' needs the simplejpeg package; using Pillow")
+
+@functools.lru_cache(maxsize=4)
+def _warn_turbo_ignores(optimize, progressive):
+    """Logs (once per setting combination) which Pillow-only JPG settings turbo ignores."""
+    ignored = [name for name, on in (("optimize", optimize), ("progressive", progressive)) if on]
+    logger.info(f"JPG backend 'turbo' writes baseline JPEGs; ignoring {', '.join(ignored)}")
+
+def save_jpeg(img, output_path, quality, optimize=False, progressive=True, backend="pillow"):
+    """
+    Encodes an RGB image to output_path. Uses simplejpeg (libjpeg-turbo with SIMD DCT)
+    when backend is "turbo" and the package is installed, otherwise Pillow's JPEG plugin.
+    
+    Args:
+        img (PIL.Image): RGB image
+        output_path (str): Destination .jpg path
+        quality (int): JPG quality (1-100)
+        optimize (bool): Run the extra Huffman optimization pass (Pillow only)
+        progressive (bool): Write a progressive JPEG (Pillow only; simplejpeg always
+                            writes baseline JPEGs)
+        backend (str): "pillow" or "turbo" (see config jpg_export.backend)
+    """
+    if backend == "turbo":
+        if simplejpeg is None:
+            _warn_turbo_unavailable()
+        else:
+            if optimize or progressive:
+                _warn_turbo_ignores(bool(optimize), bool(progressive))
+            encoded = simplejpeg.encode_jpeg(np.asarray(img), quality=quality, colorspace='RGB',
+                                             colorsubsampling='420', fastdct=True)
+            with open(output_path, 'wb') as f:
+                f.write(encoded)
+            return
+    
+    # subsampling=2 is 4:2:0 chroma, the smallest output for photographic content
+    img.save(output_path, "JPEG", quality=quality, optimize=optimize, progressive=progressive,
+             subsampling=2)
+
+def _find_source_png(png_dir, file_name, timestamp_id, prefer_solid):
+    """
+    Picks the PNG to export. Candidates are tried in priority order: the solid background
+    version (only when prefer_solid), then the transparent version, each with and without
+    the timestamp.
+    
+    Returns:
+        str: Full path of the first candidate present, or None
+    """
+    suffixes = (SOLID_BG_SUFFIX, TRANSPARENT_SUFFIX) if prefer_solid else (TRANSPARENT_SUFFIX,)
+    for suffix in suffixes:
+        for candidate in (f"{file_name}{suffix}_{timestamp_id}.png", f"{file_name}{suffix}.png"):
+            candidate_path = os.path.join(png_dir, candidate)
+            if os.path.exists(candidate_path):
+                return candidate_path
+    return None
+
+def convert_to_jpg(image_path, output_path=None, quality=None, pil_image=None, run_cleanup=True):
     """
     Converts a PNG image with solid background to JPG format.
     
@@ -23,6 +119,10 @@ def convert_to_jpg(image_path, output_path=None, quality=None):
         image_path (str): Path to the PNG image with solid background
         output_path (str, optional): Path to save the JPG image
         quality (int, optional): JPG quality (1-100, default from config)
+        pil_image (PIL.Image, optional): Already-decoded pixels of image_path; when given
+                                         the PNG is not looked up or read from disk again
+        run_cleanup (bool): Run the intelligent cleanup for this image after saving; off when
+                            the caller (process_jpg_conversion) does it itself
         
     Returns:
         str: Path to the JPG image if successful, None otherwise
@@ -51,19 +151,18 @@ def convert_to_jpg(image_path, output_path=None, quality=None):
         timestamp_id = int(time.time()) % 10000  # Use last 4 digits of timestamp
         
         # Try to extract timestamp ID from input file if it exists
-        if "_transparent_" in image_path or "_solid_background_" in image_path:
-            match = re.search(r'_(transparent|solid_background)_(\d+)', image_path)
-            if match:
-                timestamp_id = match.group(2)
+        match = SUFFIX_TIMESTAMP_RE.search(image_path)
+        if match:
+            timestamp_id = match.group(2)
         
         # Remove any suffixes from the filename to get the original name
-        if "_solid_background" in file_name:
-            file_name = file_name.replace("_solid_background", "")
+        if SOLID_BG_SUFFIX in file_name:
+            file_name = file_name.replace(SOLID_BG_SUFFIX, "")
             # Remove timestamp if present
             if "_" in file_name and file_name.split("_")[-1].isdigit():
                 file_name = "_".join(file_name.split("_")[:-1])
-        elif "_transparent" in file_name:
-            file_name = file_name.replace("_transparent", "")
+        elif TRANSPARENT_SUFFIX in file_name:
+            file_name = file_name.replace(TRANSPARENT_SUFFIX, "")
             # Remove timestamp if present
             if "_" in file_name and file_name.split("_")[-1].isdigit():
                 file_name = "_".join(file_name.split("_")[:-1])
@@ -86,42 +185,21 @@ def convert_to_jpg(image_path, output_path=None, quality=None):
         solid_bg_enabled = get_solid_bg_enabled()
         crop_enabled = get_auto_crop_enabled()
         
-        input_path = None
+        input_path = image_path if pil_image is not None else None
         
         # Priority order based on enabled features:
         # 1. If both solid BG and crop are enabled: use solid background version (it should be cropped already)
         # 2. If only solid BG enabled: use solid background version  
         # 3. If only crop enabled: use transparent version (it should be cropped already)
         # 4. If neither enabled: use transparent version
-        
-        if solid_bg_enabled:
-            # Look for solid background version with or without timestamp
-            patterns_to_try = [
-                os.path.join(png_dir, f"{file_name}_solid_background_{timestamp_id}.png"),
-                os.path.join(png_dir, f"{file_name}_solid_background.png")
-            ]
-            
-            for pattern in patterns_to_try:
-                if os.path.exists(pattern):
-                    input_path = pattern
-                    logger.info(f"Using solid background image: {os.path.basename(input_path)}")
-                    break
-        
-        # If no solid background found or solid BG disabled, look for transparent version
         if not input_path:
-            patterns_to_try = [
-                os.path.join(png_dir, f"{file_name}_transparent_{timestamp_id}.png"),
-                os.path.join(png_dir, f"{file_name}_transparent.png")
-            ]
-            
-            for pattern in patterns_to_try:
-                if os.path.exists(pattern):
-                    input_path = pattern
-                    if crop_enabled:
-                        logger.info(f"Using transparent image (should be cropped): {os.path.basename(input_path)}")
-                    else:
-                        logger.info(f"Using transparent image (not cropped): {os.path.basename(input_path)}")
-                    break
+            input_path = _find_source_png(png_dir, file_name, timestamp_id, prefer_solid=solid_bg_enabled)
+            if input_path and SOLID_BG_SUFFIX in os.path.basename(input_path):
+                logger.info(f"Using solid background image: {os.path.basename(input_path)}")
+            elif input_path and crop_enabled:
+                logger.info(f"Using transparent image (should be cropped): {os.path.basename(input_path)}")
+            elif input_path:
+                logger.info(f"Using transparent image (not cropped): {os.path.basename(input_path)}")
         
         # Final fallback to provided path
         if not input_path:
@@ -132,33 +210,38 @@ def convert_to_jpg(image_path, output_path=None, quality=None):
         if output_path is None:
             output_path = os.path.join(jpg_dir, f"{file_name}_{timestamp_id}.jpg")
         
-        # Open the input image 
-        img = Image.open(input_path)
+        # Open the input image (unless the caller handed us the decoded pixels)
+        if pil_image is not None:
+            logger.info(f"Using in-memory image for: {os.path.basename(input_path)}")
+            img = pil_image
+        else:
+            img = Image.open(input_path)
+            # Decode straight to RGB where the format supports it (JPEG fallback inputs)
+            img.draft('RGB', img.size)
         
+        # Solid background outputs are RGBA with a fully opaque alpha, so dropping the
+        # channel gives the same pixels as blending over white without the blend pass
+        if img.mode == 'RGBA' and SOLID_BG_SUFFIX in os.path.basename(input_path):
+            img = img.convert('RGB')
         # If image has alpha channel, composite it over white background
-        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        elif img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
             logger.info(f"Image has transparency, compositing over white background")
-            # Create a white background image
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            # Paste the image on the background using alpha as mask
-            if img.mode == 'RGBA':
-                background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-            else:
-                background.paste(img, mask=img)  # PIL handles transparency automatically
-            img = background
+            img = composite_over_white(img)
         elif img.mode != 'RGB':
             # Convert other non-RGB modes to RGB
             img = img.convert('RGB')
         
-        # Save as JPG with specified quality
-        img.save(output_path, "JPEG", quality=quality, optimize=True)
+        # Save as JPG with specified quality and encoder settings from config
+        save_jpeg(img, output_path, quality, optimize=get_jpg_optimize(), progressive=get_jpg_progressive(),
+                  backend=get_jpg_backend())
         
         logger.info(f"Saved JPG: {output_path} (quality={quality})")
         logger.info(f"Config: crop_enabled={crop_enabled}, solid_bg_enabled={solid_bg_enabled}")
         
         # INTELLIGENT CLEANUP: Check if this is the final operation and cleanup if needed
-        logger.info("JPG: Checking if intelligent cleanup should run after JPG conversion...")
-        intelligent_cleanup_after_all_operations(output_path, ["jpg_export"])
+        if run_cleanup:
+            logger.info("JPG: Checking if intelligent cleanup should run after JPG conversion...")
+            intelligent_cleanup_after_all_operations(output_path, ["jpg_export"])
         
         return output_path
         
@@ -168,28 +251,29 @@ def convert_to_jpg(image_path, output_path=None, quality=None):
         traceback.print_exc()
         return None
 
-def process_jpg_conversion(image_path):
+def process_jpg_conversion(image_path, pil_image=None):
     """
     Process JPG conversion for any PNG image (solid or transparent).
     This is a convenience function to be called after image processing.
     
     Args:
         image_path (str): Path to any PNG image (solid or transparent)
+        pil_image (PIL.Image, optional): Decoded pixels of image_path, forwarded to convert_to_jpg
         
     Returns:
         str: Path to the JPG image if successful, None otherwise
     """
-    if not image_path or not os.path.exists(image_path):
-        logger.warning("No valid image path provided for JPG conversion")
-        return None
-        
     if not get_jpg_export_enabled():
         logger.info("JPG export is disabled in config")
         return None
     
-    result = convert_to_jpg(image_path)
+    if not image_path or not os.path.exists(image_path):
+        logger.warning("No valid image path provided for JPG conversion")
+        return None
+    
+    result = convert_to_jpg(image_path, pil_image=pil_image, run_cleanup=False)
     
-    # If this is being called directly (not from convert_to_jpg), also check for cleanup
+    # Cleanup runs once here rather than again inside convert_to_jpg
     if result:
         logger.info("JPG PROCESS: Checking if intelligent cleanup should run after JPG processing...")
         intelligent_cleanup_after_all_operations(result, ["jpg_export"])
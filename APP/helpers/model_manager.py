@@ -1,10 +1,7 @@
 import os
-import sys
-import requests
 import shutil
-from pathlib import Path
-from PIL import Image
 import threading
+import time
 
 # Tentukan lokasi penyimpanan model 
 # (di dalam folder proyek untuk self-contained)
@@ -34,10 +31,223 @@ MODEL_FILENAMES = {
     "u2net_cloth_seg": "u2net_cloth_seg.onnx",
 }
 
-# Variabel untuk melacak unduhan yang sedang berjalan
+def get_model_file_path(model_name):
+    """
+    Path file .onnx untuk model (nama file dari MODEL_FILENAMES, atau <nama>.onnx).
+    
+    Args:
+        model_name (str): Nama model
+        
+    Returns:
+        str: Path file model di MODEL_DIR
+    """
+    return os.path.join(MODEL_DIR, MODEL_FILENAMES.get(model_name, f"{model_name}.onnx"))
+
+# Unduhan yang sedang berjalan: nama model -> threading.Event yang di-set saat unduhan selesai
 current_downloads = {}
 download_lock = threading.Lock()
 
+# Model yang sudah dipastikan ada di disk; prepare_model dipanggil untuk setiap gambar
+_ready_models = set()
+
+# Ukuran blok unduhan: 1 MiB menjaga jumlah iterasi Python tetap kecil (~170 untuk model 170 MB)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Unduhan paralel: jumlah permintaan Range sekaligus, dan ukuran minimum file agar layak dipecah
+DOWNLOAD_PARTS = 8
+PARALLEL_DOWNLOAD_MIN_SIZE = 16 << 20
+
+
+# Interval laporan progress unduhan ke UI (detik)
+PROGRESS_INTERVAL = 0.15
+
+
+class _ProgressWriter:
+    """
+    File wrapper for shutil.copyfileobj that counts written bytes. Progress is reported
+    by a small background thread every PROGRESS_INTERVAL seconds while the writer is
+    used as a context manager, so the write loop itself only counts bytes and the UI
+    cadence does not depend on how fast chunks arrive.
+    """
+
+    def __init__(self, f, total_size, callback, model_name, downloaded=0):
+        self._f = f
+        self.total_size = total_size
+        self.callback = callback
+        self.model_name = model_name
+        self.downloaded = downloaded
+
+        # Unduhan paralel menambah hitungan dari beberapa thread sekaligus
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reporter = None
+
+    def __enter__(self):
+        if self.callback and self.total_size:
+            self._reporter = threading.Thread(target=self._report_loop, daemon=True)
+            self._reporter.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._reporter is not None:
+            self._reporter.join()
+        return False
+
+    def _report_loop(self):
+        last_progress = None
+        while not self._stop.wait(PROGRESS_INTERVAL):
+            progress = (self.downloaded / self.total_size) * 100
+            if progress == last_progress:
+                continue
+            try:
+                self.callback(self.model_name, progress)
+            except Exception:
+                pass
+            last_progress = progress
+
+    def write(self, data):
+        written = self._f.write(data)
+        self.advance(len(data))
+        return written
+
+    def advance(self, nbytes):
+        with self._lock:
+            self.downloaded += nbytes
+
+
+class _PartWriter:
+    """File wrapper for one byte range of a parallel download; reports into a shared _ProgressWriter."""
+
+    def __init__(self, f, progress):
+        self._f = f
+        self._progress = progress
+
+    def write(self, data):
+        written = self._f.write(data)
+        self._progress.advance(len(data))
+        return written
+
+
+def _parallel_download(url, temp_path, callback, model_name, parts=DOWNLOAD_PARTS):
+    """
+    Mengunduh file dengan beberapa permintaan Range paralel ke file yang sudah dialokasikan.
+    Satu koneksi TCP jarang bisa memenuhi bandwidth dari CDN GitHub; beberapa koneksi bisa.
+    
+    Args:
+        url (str): URL file
+        temp_path (str): Path file sementara tujuan
+        callback (function, optional): Fungsi callback untuk progress download
+        model_name (str): Nama model (untuk callback)
+        parts (int): Jumlah permintaan Range sekaligus
+        
+    Returns:
+        tuple: (downloaded, total_size), atau None jika server tidak mendukung Range atau
+               file terlalu kecil (pemanggil memakai unduhan satu aliran)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=parts)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # Byte range harus menunjuk ke file apa adanya, bukan versi yang dikompres
+        session.headers['Accept-Encoding'] = 'identity'
+
+        head = session.head(url, allow_redirects=True, timeout=30)
+        total_size = int(head.headers.get('content-length', 0))
+        if (not head.ok or head.headers.get('Accept-Ranges', '').lower() != 'bytes'
+                or total_size < PARALLEL_DOWNLOAD_MIN_SIZE):
+            return None
+
+        # Pakai URL akhir setelah redirect agar setiap bagian tidak mengulang redirect
+        final_url = head.url
+        part_size = -(-total_size // parts)
+        ranges = [(start, min(start + part_size, total_size) - 1) for start in range(0, total_size, part_size)]
+        progress = _ProgressWriter(None, total_size, callback, model_name)
+
+        def fetch(byte_range):
+            start, end = byte_range
+            with session.get(final_url, stream=True, headers={'Range': f'bytes={start}-{end}'}, timeout=30) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    return False
+                with open(temp_path, 'r+b') as f:
+                    f.seek(start)
+                    shutil.copyfileobj(r.raw, _PartWriter(f, progress), length=DOWNLOAD_CHUNK_SIZE)
+                    f.flush()
+                    os.fsync(f.fileno())
+            return True
+
+        # Alokasikan file penuh sekali; setiap bagian menulis di offset-nya sendiri
+        with open(temp_path, 'wb') as f:
+            f.truncate(total_size)
+
+        try:
+            with progress, ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                all_ranged = all(executor.map(fetch, ranges))
+        except Exception:
+            # File berlubang tidak boleh dianggap unduhan parsial yang bisa dilanjutkan
+            os.remove(temp_path)
+            raise
+
+        if not all_ranged:
+            os.remove(temp_path)
+            return None
+
+        return progress.downloaded, total_size
+
+
+def _stream_download(url, temp_path, etag_path, resume_from, callback, model_name):
+    """
+    Mengunduh file dengan satu aliran, melanjutkan file parsial jika memungkinkan.
+    
+    Returns:
+        tuple: (downloaded, total_size)
+    """
+    import requests
+
+    # Lanjutkan unduhan yang terputus: minta sisa byte saja, tetapi hanya jika file di
+    # server masih sama (If-Range dengan ETag yang disimpan saat unduhan dimulai)
+    headers = {}
+    if resume_from:
+        with open(etag_path, 'r', encoding='utf-8') as ef:
+            headers['Range'] = f'bytes={resume_from}-'
+            headers['If-Range'] = ef.read().strip()
+
+    with requests.get(url, stream=True, headers=headers) as r:
+        r.raise_for_status()
+        content_length = int(r.headers.get('content-length', 0))
+        
+        if r.status_code == 206:
+            # Server mengirim sisa file: tambahkan ke file parsial
+            print(f"Melanjutkan unduhan {model_name} dari {resume_from} byte")
+            mode = 'ab'
+            total_size = resume_from + content_length if content_length else 0
+        else:
+            # Unduhan baru (atau file di server berubah): simpan ETag untuk resume berikutnya
+            resume_from = 0
+            mode = 'wb'
+            total_size = content_length
+            etag = r.headers.get('ETag')
+            if etag:
+                with open(etag_path, 'w', encoding='utf-8') as ef:
+                    ef.write(etag)
+            elif os.path.exists(etag_path):
+                os.remove(etag_path)
+        
+        # Salin langsung dari socket ke file dalam blok besar (gzip/deflate tetap didekode)
+        r.raw.decode_content = True
+        with open(temp_path, mode) as f, _ProgressWriter(f, total_size, callback, model_name, resume_from) as writer:
+            shutil.copyfileobj(r.raw, writer, length=DOWNLOAD_CHUNK_SIZE)
+            # Pastikan data benar-benar di disk sebelum rename, agar listrik padam tidak
+            # meninggalkan model rusak yang lolos pemeriksaan "file sudah ada"
+            f.flush()
+            os.fsync(f.fileno())
+
+    return writer.downloaded, total_size
+
 def download_model(model_name, callback=None):
     """
     Mengunduh model jika belum ada.
@@ -49,92 +259,105 @@ def download_model(model_name, callback=None):
     Returns:
         bool: True jika berhasil, False jika gagal
     """
-    if model_name not in MODELS:
+    url = MODELS.get(model_name)
+    if url is None:
         print(f"Model {model_name} tidak ditemukan")
         return False
         
-    model_path = os.path.join(MODEL_DIR, MODEL_FILENAMES[model_name])
+    model_path = get_model_file_path(model_name)
     
     # Cek apakah model sudah ada
     if os.path.exists(model_path):
         print(f"Model {model_name} sudah ada di {model_path}")
         return True
-        
-    # Cek apakah model sedang diunduh
+    
+    return _download_missing_model(model_name, url, model_path, callback)
+
+
+def _download_missing_model(model_name, url, model_path, callback):
+    """
+    Unduh model yang sudah diketahui belum ada di model_path (pemanggil sudah memeriksa
+    os.path.exists). Hanya satu thread yang mengunduh; thread lain menunggu hasilnya.
+    """
+    # Cek apakah model sedang diunduh; pemanggil kedua menunggu hasil unduhan yang sama
     with download_lock:
-        if model_name in current_downloads:
-            print(f"Model {model_name} sedang diunduh...")
-            return False
-        else:
-            current_downloads[model_name] = True
+        done_event = current_downloads.get(model_name)
+        is_owner = done_event is None
+        if is_owner:
+            done_event = threading.Event()
+            current_downloads[model_name] = done_event
+    
+    if not is_owner:
+        print(f"Model {model_name} sedang diunduh, menunggu...")
+        done_event.wait()
+        return os.path.exists(model_path)
     
-    # Mulai proses unduhan
-    url = MODELS[model_name]
+    try:
+        # Unduhan lain bisa saja selesai di antara pemeriksaan di atas dan pengambilan lock
+        if os.path.exists(model_path):
+            return True
+        return _download_model_file(model_name, url, model_path, callback)
+    finally:
+        with download_lock:
+            current_downloads.pop(model_name, None)
+        done_event.set()
+
+
+def _download_model_file(model_name, url, model_path, callback):
+    """Unduh file model ke model_path (dipanggil hanya oleh satu thread per model)."""
+    # requests hanya dimuat saat benar-benar mengunduh, bukan saat modul diimpor
+    import requests
+
     try:
         print(f"Mengunduh model {model_name} dari {url}...")
         
         # Buat direktori temporary untuk unduhan
         temp_path = model_path + ".download"
+        etag_path = model_path + ".etag"
         
-        # Unduh file
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(temp_path, 'wb') as f:
-                # Throttle callbacks to avoid overwhelming UI thread
-                import time
-                last_emit_time = 0.0
-                last_progress = 0.0
-
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-
-                        # Hitung dan panggil callback hanya jika ada perubahan signifikan
-                        if callback and total_size:
-                            progress = (downloaded / total_size) * 100
-                            now = time.monotonic()
-
-                            # Emit when progress increased by >=0.5% OR at least 0.15s passed
-                            if (progress - last_progress) >= 0.5 or (now - last_emit_time) >= 0.15 or progress >= 99.9:
-                                try:
-                                    callback(model_name, progress)
-                                except Exception:
-                                    pass
-                                last_emit_time = now
-                                last_progress = progress
-
-            # Rename file jika unduhan selesai
-            shutil.move(temp_path, model_path)
-
-            # Emit final callback 100% to ensure UI reaches completion
+        # File parsial hanya bisa dilanjutkan jika ETag-nya tersimpan
+        resume_from = 0
+        if os.path.exists(etag_path):
             try:
-                if callback:
-                    callback(model_name, 100.0)
-            except Exception:
-                pass
-            
-            print(f"Model {model_name} berhasil diunduh ke {model_path}")
-            
-            with download_lock:
-                if model_name in current_downloads:
-                    del current_downloads[model_name]
-                    
-            return True
+                resume_from = os.path.getsize(temp_path)
+            except OSError:
+                resume_from = 0
+        
+        # Unduhan baru: coba beberapa permintaan Range paralel, jika tidak didukung pakai satu aliran
+        result = None
+        if not resume_from:
+            result = _parallel_download(url, temp_path, callback, model_name)
+        if result is None:
+            result = _stream_download(url, temp_path, etag_path, resume_from, callback, model_name)
+        downloaded, total_size = result
+
+        if total_size and downloaded != total_size:
+            raise IOError(f"Unduhan tidak lengkap: {downloaded} dari {total_size} byte")
+
+        # Rename file jika unduhan selesai (os.replace: satu rename atomik di folder yang sama)
+        os.replace(temp_path, model_path)
+        if os.path.exists(etag_path):
+            os.remove(etag_path)
+
+        # Emit final callback 100% to ensure UI reaches completion
+        try:
+            if callback:
+                callback(model_name, 100.0)
+        except Exception:
+            pass
+        
+        print(f"Model {model_name} berhasil diunduh ke {model_path}")
+        return True
             
     except Exception as e:
         print(f"Gagal mengunduh model {model_name}: {str(e)}")
         
-        # Hapus file unduhan yang tidak lengkap
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            
-        with download_lock:
-            if model_name in current_downloads:
-                del current_downloads[model_name]
+        # File parsial disimpan agar bisa dilanjutkan; hapus hanya jika server menolak
+        # permintaan (mis. 416), karena melanjutkannya tidak akan pernah berhasil
+        if isinstance(e, requests.HTTPError):
+            for leftover in (temp_path, etag_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
                 
         return False
 
@@ -159,13 +382,18 @@ GITHUB_RELEASE_API_URL = "https://api.github.com/repos/danielgatis/rembg/release
 _fetched_once = False
 CACHE_PATH = os.path.join(MODEL_DIR, "models_cache.json")
 
+# Daftar aset rilis jarang berubah: dalam rentang ini cache dipakai tanpa menghubungi GitHub
+MODELS_CACHE_MAX_AGE = 24 * 60 * 60
+
 
-def _save_models_cache():
-    """Save current MODELS and MODEL_FILENAMES to a local cache JSON file."""
+def _save_models_cache(etag=None):
+    """Save current MODELS and MODEL_FILENAMES (plus the API ETag and fetch time) to a local cache JSON file."""
     try:
         payload = {
             'models': MODELS,
-            'filenames': MODEL_FILENAMES
+            'filenames': MODEL_FILENAMES,
+            'etag': etag,
+            'fetched_at': time.time()
         }
         with open(CACHE_PATH, 'w', encoding='utf-8') as f:
             import json
@@ -175,36 +403,47 @@ def _save_models_cache():
         print(f"Warning: failed to save models cache: {str(e)}")
 
 
-def _load_models_cache():
-    """Load models and filenames from local cache if present and merge into runtime dicts."""
+def _read_models_cache():
+    """Return the raw cache payload, or an empty dict if there is no readable cache."""
     try:
         if not os.path.exists(CACHE_PATH):
             return {}
         import json
         with open(CACHE_PATH, 'r', encoding='utf-8') as f:
-            payload = json.load(f)
-        models = payload.get('models', {}) or {}
-        filenames = payload.get('filenames', {}) or {}
-
-        if models:
-            MODELS.update(models)
-        if filenames:
-            MODEL_FILENAMES.update(filenames)
-
-        return models
+            return json.load(f) or {}
     except Exception as e:
         print(f"Warning: failed to load models cache: {str(e)}")
         return {}
 
 
+def _merge_models_cache(payload):
+    """Merge models and filenames from a cache payload into the runtime dicts."""
+    models = payload.get('models', {}) or {}
+    filenames = payload.get('filenames', {}) or {}
+
+    if models:
+        MODELS.update(models)
+    if filenames:
+        MODEL_FILENAMES.update(filenames)
+
+    return models
+
+
+def _load_models_cache():
+    """Load models and filenames from local cache if present and merge into runtime dicts."""
+    return _merge_models_cache(_read_models_cache())
+
+
 def fetch_models_from_github(force=False):
     """Fetch ONNX asset list from the rembg GitHub release and return mapping name->url.
 
-    Uses a simple in-memory cache to avoid repeated API calls, and falls back to a
-    local cache file if GitHub is unreachable.
+    Uses a simple in-memory cache to avoid repeated API calls, and a local cache file
+    that is trusted for MODELS_CACHE_MAX_AGE and then revalidated with its ETag
+    (GitHub answers 304 without a body when the release is unchanged). The cache file
+    is also the fallback if GitHub is unreachable.
 
     Args:
-        force (bool): If True, force a re-fetch even if already fetched.
+        force (bool): If True, force a re-fetch even if already fetched or the cache is fresh.
 
     Returns:
         dict: {model_key: download_url}
@@ -213,12 +452,27 @@ def fetch_models_from_github(force=False):
     if _fetched_once and not force:
         return {}
 
+    payload = _read_models_cache()
+    cached_models = payload.get('models') or {}
+    if not force and cached_models and time.time() - payload.get('fetched_at', 0) < MODELS_CACHE_MAX_AGE:
+        _fetched_once = True
+        return _merge_models_cache(payload)
+
     try:
+        import requests
         headers = {
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'Keong-MAS'
         }
+        if cached_models and payload.get('etag'):
+            headers['If-None-Match'] = payload['etag']
         resp = requests.get(GITHUB_RELEASE_API_URL, headers=headers, timeout=10)
+        if resp.status_code == 304:
+            # Rilis tidak berubah: pakai cache dan perbarui waktu validasinya
+            _fetched_once = True
+            cached = _merge_models_cache(payload)
+            _save_models_cache(payload['etag'])
+            return cached
         resp.raise_for_status()
         data = resp.json()
 
@@ -238,13 +492,13 @@ def fetch_models_from_github(force=False):
             MODELS.update(found)
             _fetched_once = True
             # Persist cache for offline use
-            _save_models_cache()
+            _save_models_cache(resp.headers.get('ETag'))
             # Fetch completed (silent): results merged into MODELS
 
     except Exception as e:
         print(f"Warning: failed to fetch model list from GitHub: {str(e)}")
         # Attempt to load from local cache when network fails
-        cached = _load_models_cache()
+        cached = _merge_models_cache(payload)
         if cached:
             _fetched_once = True
             return cached
@@ -285,22 +539,100 @@ def prepare_model(image_path=None, model_name=None, callback=None):
     # Gunakan parameter jika diberikan, jika tidak gunakan default
     if model_name is None:
         model_name = DEFAULT_MODEL
+    
+    # Jalur cepat: model ini sudah diverifikasi sebelumnya, tanpa stat lagi
+    if model_name in _ready_models:
+        return model_name
         
     # Verifikasi apakah model ada di path
-    model_file_path = os.path.join(MODEL_DIR, MODEL_FILENAMES.get(model_name, f"{model_name}.onnx"))
+    model_file_path = get_model_file_path(model_name)
     
     if os.path.exists(model_file_path):
+        _ready_models.add(model_name)
         return model_name
         
-    # Download model jika belum ada
+    # Download model jika belum ada (file sudah dipastikan tidak ada, jadi tidak perlu stat lagi)
     print(f"Model {model_name} tidak ditemukan, mengunduh...")
-    success = download_model(model_name, callback)
+    url = MODELS.get(model_name)
+    if url is None:
+        print(f"Model {model_name} tidak ditemukan")
+        success = False
+    else:
+        success = _download_missing_model(model_name, url, model_file_path, callback)
     
-    if not success:
+    if success:
+        _ready_models.add(model_name)
+    else:
         print(f"PERINGATAN: Gagal mengunduh model {model_name}")
             
     return model_name
 
+# Model yang boleh dijalankan sebagai salinan INT8 lewat sesi "custom" rembg, dengan nama
+# sesi custom-nya. Hanya model yang ukuran input, normalisasi dan output-nya sama persis
+# dengan sesi custom tersebut; model lain (cloth_seg, birefnet, sam, ...) tetap FP32
+INT8_CUSTOM_SESSIONS = {
+    "isnet-general-use": "dis_custom",
+    "u2net": "u2net_custom",
+    "u2netp": "u2net_custom",
+    "u2net_human_seg": "u2net_custom",
+}
+
+# Satu quantization dalam satu waktu; worker lain menunggu lalu memakai hasilnya
+_quantize_lock = threading.Lock()
+
+def get_int8_custom_session(model_name):
+    """
+    Nama sesi custom rembg untuk menjalankan salinan INT8 model ini, atau None jika
+    model tidak didukung dalam mode INT8.
+    """
+    return INT8_CUSTOM_SESSIONS.get(model_name)
+
+def get_quantized_model_path(model_name):
+    """
+    Mengembalikan path salinan model INT8 (dynamic quantization), dibuat sekali di samping
+    model aslinya (mis. isnet-general-use.int8.onnx). Bobot INT8 memakai instruksi VNNI/AVX2
+    di CPU dan ukurannya ~4x lebih kecil.
+    
+    Args:
+        model_name (str): Nama model
+        
+    Returns:
+        str: Path model INT8, atau None jika model tidak didukung (lihat INT8_CUSTOM_SESSIONS),
+             belum ada, atau quantization tidak tersedia
+    """
+    if get_int8_custom_session(model_name) is None:
+        return None
+    model_path = get_model_file_path(model_name)
+    quantized_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+    if os.path.exists(quantized_path):
+        return quantized_path
+    if not os.path.exists(model_path):
+        return None
+    
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        print("onnxruntime.quantization tidak tersedia, memakai model FP32")
+        return None
+    
+    with _quantize_lock:
+        # Worker lain mungkin sudah selesai membuatnya selagi kita menunggu
+        if os.path.exists(quantized_path):
+            return quantized_path
+        
+        # Nama sementara unik per proses/thread agar tidak saling menimpa
+        temp_path = f"{quantized_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            print(f"Membuat model INT8 untuk {model_name}...")
+            quantize_dynamic(model_path, temp_path, weight_type=QuantType.QInt8)
+            os.replace(temp_path, quantized_path)
+            return quantized_path
+        except Exception as e:
+            print(f"Gagal membuat model INT8 untuk {model_name}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
 def set_model_path():
     """
     Set environment variable untuk lokasi model rembg.
@@ -308,15 +640,8 @@ def set_model_path():
     Returns:
         str: Path direktori model
     """
+    # MODEL_DIR sudah dibuat saat modul diimpor (os.makedirs di atas)
     os.environ["U2NET_HOME"] = MODEL_DIR
-
-    # Ensure model directory exists
-    if not os.path.exists(MODEL_DIR):
-        os.makedirs(MODEL_DIR, exist_ok=True)
-
-    # Minimal status: report model path and availability
-    models_found = [f for f in os.listdir(MODEL_DIR) if f.endswith('.onnx')]
-    
     return MODEL_DIR
 
 # Set model path saat modul diimpor
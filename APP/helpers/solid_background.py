@@ -3,27 +3,126 @@ Solid background module for Keong-MAS application.
 Provides functions to add a solid background to transparent images.
 """
 import os
+import re
+import time
 import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PIL import Image
 
-from APP.helpers.config_manager import (
-    get_solid_bg_enabled,
-    get_solid_bg_color,
-    get_solid_bg_margin
-)
+from APP.helpers.config_manager import get_solid_bg_settings
 from APP.helpers.cleanup_manager import intelligent_cleanup_after_all_operations
+from APP.helpers.image_utils import save_png_atomic, FINAL_PNG_COMPRESS_LEVEL
+
+# Numba is optional; when present small alpha masks are scanned and the solid background
+# blend runs as compiled kernels
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("SolidBackground")
 
+# Per-thread scratch memory for the full-size temporaries of the NumPy blend; kept at the
+# size of the largest image seen so a batch does not allocate (and page in) fresh masks per image
+_SCRATCH = threading.local()
+
+# Timestamp ID in output names such as "foto_transparent_1234.png"
+_TRANSPARENT_RE = re.compile(r'_transparent_(\d+)')
+
+# Above this many pixels the vectorized NumPy reductions are as fast as the kernel
+NUMBA_BOUNDS_MAX_PIXELS = 4_000_000
+
+# Final PNG encodes requested with background_save=True run here, so the caller can
+# start on the next image while zlib works (encoding releases the GIL)
+_SAVE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bg-save')
+_pending_saves = {}  # future -> output_path
+_failed_saves = []  # output paths whose background save failed, reported by flush_saves
+_pending_saves_lock = threading.Lock()
+
+if njit is not None:
+    @njit(cache=True, boundscheck=False)
+    def _content_bounds_kernel(alpha, threshold):
+        """
+        Scans the alpha mask for (left, top, right, bottom) of pixels above threshold without
+        allocating a boolean mask. Rows are scanned from each end until the first hit, and
+        inside the content rows each side stops at the first hit. Returns (-1, -1, -1, -1)
+        if nothing is found.
+        """
+        height, width = alpha.shape
+        top = -1
+        for y in range(height):
+            for x in range(width):
+                if alpha[y, x] > threshold:
+                    top = y
+                    break
+            if top >= 0:
+                break
+        if top < 0:
+            return -1, -1, -1, -1
+        
+        bottom = top + 1
+        for y in range(height - 1, top, -1):
+            found = False
+            for x in range(width):
+                if alpha[y, x] > threshold:
+                    found = True
+                    break
+            if found:
+                bottom = y + 1
+                break
+        
+        left = width
+        right = 0
+        for y in range(top, bottom):
+            for x in range(left):
+                if alpha[y, x] > threshold:
+                    left = x
+                    break
+            for x in range(width - 1, right - 1, -1):
+                if alpha[y, x] > threshold:
+                    right = x + 1
+                    break
+        return left, top, right, bottom
+
+    @njit(cache=True, parallel=True, boundscheck=False)
+    def _composite_solid_kernel(fg, lut, bg_r, bg_g, bg_b, out):
+        """
+        One fused pass of composite_over_solid_color: LUT lookup, opaque/transparent
+        shortcuts and the fixed-point paste + blend per pixel, rows spread over all cores.
+        """
+        height, width = fg.shape[0], fg.shape[1]
+        bg = (bg_r, bg_g, bg_b)
+        for y in prange(height):
+            for x in range(width):
+                a = np.uint32(fg[y, x, 3])
+                out[y, x, 3] = 255
+                if a == 255:
+                    out[y, x, 0] = fg[y, x, 0]
+                    out[y, x, 1] = fg[y, x, 1]
+                    out[y, x, 2] = fg[y, x, 2]
+                    continue
+                w = np.uint32(lut[a])
+                for c in range(3):
+                    if w == 0:
+                        out[y, x, c] = bg[c]
+                        continue
+                    v = np.uint32(fg[y, x, c]) * a + 128
+                    v = (v + (v >> 8)) >> 8
+                    v = v * w + np.uint32(bg[c]) * (255 - w) + 128
+                    out[y, x, c] = (v + (v >> 8)) >> 8
+
+@functools.lru_cache(maxsize=32)
 def hex_to_rgb(hex_color):
     """
     Convert hex color string to RGB tuple
     
     Args:
-        hex_color (str): Color in hex format (e.g., #FFFFFF)
+        hex_color (str): Color in hex format (#RRGGBB, short #RGB or Qt's #AARRGGBB)
         
     Returns:
         tuple: RGB values as (r, g, b)
@@ -31,6 +130,13 @@ def hex_to_rgb(hex_color):
     # Remove # if present
     hex_color = hex_color.lstrip('#')
     
+    # Normalize the other notations to RRGGBB (the alpha of #AARRGGBB is ignored,
+    # the background is always opaque)
+    if len(hex_color) == 3:
+        hex_color = ''.join(c * 2 for c in hex_color)
+    elif len(hex_color) == 8:
+        hex_color = hex_color[2:]
+    
     # Convert to RGB
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
@@ -39,19 +145,25 @@ def get_content_bounds(image):
     Analyze the alpha channel to find the bounds of the actual content
     
     Args:
-        image (PIL.Image): Transparent image with alpha channel
+        image (PIL.Image or numpy.ndarray): Transparent image with alpha channel, or its
+            HxWx4 RGBA pixel array (the alpha plane is then read in place, without a copy)
         
     Returns:
         tuple: (left, top, right, bottom) bounds of content
     """
-    # Convert to numpy array and extract alpha channel
-    img_array = np.array(image)
-    if img_array.shape[2] < 4:  # Not RGBA
-        logger.warning("Image doesn't have an alpha channel, using full dimensions")
-        height, width = img_array.shape[:2]
-        return 0, 0, width, height
-    
-    alpha = img_array[:, :, 3]
+    if isinstance(image, np.ndarray):
+        if image.ndim != 3 or image.shape[2] != 4:
+            logger.warning("Image doesn't have an alpha channel, using full dimensions")
+            return 0, 0, image.shape[1], image.shape[0]
+        alpha = image[:, :, 3]
+    else:
+        # Extract only the alpha band (no full RGBA array copy just to read one channel)
+        if 'A' not in image.getbands():
+            logger.warning("Image doesn't have an alpha channel, using full dimensions")
+            width, height = image.size
+            return 0, 0, width, height
+        
+        alpha = np.asarray(image.getchannel('A'))
     
     # Find the boundaries where content exists (non-zero alpha)
     height, width = alpha.shape
@@ -59,44 +171,28 @@ def get_content_bounds(image):
     # Use a threshold to determine what counts as "content"
     threshold = 5  # Low threshold to detect almost transparent pixels too
     
-    # Find bounds (similar to image_crop logic)
-    # Find leftmost non-empty column
-    left = 0
-    while left < width:
-        if np.max(alpha[:, left]) > threshold:
-            break
-        left += 1
-    
-    # Find rightmost non-empty column
-    right = width - 1
-    while right >= 0:
-        if np.max(alpha[:, right]) > threshold:
-            break
-        right -= 1
-    
-    # Find topmost non-empty row
-    top = 0
-    while top < height:
-        if np.max(alpha[top, :]) > threshold:
-            break
-        top += 1
-    
-    # Find bottommost non-empty row
-    bottom = height - 1
-    while bottom >= 0:
-        if np.max(alpha[bottom, :]) > threshold:
-            break
-        bottom -= 1
-    
-    # If the entire image is empty, return full dimensions
-    if left >= right or top >= bottom:
+    if njit is not None and alpha.size < NUMBA_BOUNDS_MAX_PIXELS:
+        left, top, right, bottom = _content_bounds_kernel(alpha, threshold)
+        has_content = left >= 0
+    else:
+        # Find bounds (similar to image_crop logic) with two vectorized reductions instead of
+        # walking columns/rows one at a time in Python. Reducing the uint8 alpha to per-column
+        # and per-row maxima first means only W + H values are compared, never an HxW bool mask
+        cols = alpha.max(axis=0) > threshold
+        rows = alpha.max(axis=1) > threshold
+        
+        # argmax on the reversed profile gives the exclusive right/bottom bound directly
+        left = int(cols.argmax())
+        right = width - int(cols[::-1].argmax())
+        top = int(rows.argmax())
+        bottom = height - int(rows[::-1].argmax())
+        has_content = bool(cols[left])
+    
+    # If the entire image is empty (or the content is a single row/column), return full dimensions
+    if not has_content or right - left <= 1 or bottom - top <= 1:
         logger.warning("No content detected in image, using full dimensions")
         return 0, 0, width, height
     
-    # Add 1 to make bounds inclusive
-    right += 1
-    bottom += 1
-    
     logger.info(f"Content bounds: left={left}, top={top}, right={right}, bottom={bottom}")
     return left, top, right, bottom
 
@@ -130,85 +226,166 @@ def calculate_smart_margins(content_bounds, image_size, requested_margin):
     logger.info(f"Smart margins: left={left_margin}, top={top_margin}, right={right_margin}, bottom={bottom_margin} (requested={requested_margin})")
     return left_margin, top_margin, right_margin, bottom_margin
 
-def composite_layers_like_graphics_software(foreground, background):
+# Edge refinement levels (black, mid, white) used when compositing onto a solid color:
+# 20 removes dark fringe, 128 leaves midtones alone, 235 cleans light fringe
+EDGE_LEVELS = (20, 128, 235)
+
+@functools.lru_cache(maxsize=8)
+def _levels_weight_lut(black_point, mid_point, white_point):
     """
-    Composites two images like professional graphics software would, preserving RGB values
-    and using edge refinement to eliminate dark fringing.
-    
-    Args:
-        foreground (PIL.Image): The foreground RGBA image with transparency
-        background (PIL.Image): The background RGBA image (usually solid color)
-        
-    Returns:
-        PIL.Image: The composited image with clean edges and no dark fringing
+    256-entry float32 table with the refined (0-1) alpha for every 8-bit alpha value:
+    levels clip/normalize, plus gamma from the midpoint. Evaluating the curve once per
+    possible value replaces per-pixel clip and power calls. Read-only, memoized.
     """
-    # Ensure both images are RGBA
-    fg = foreground.convert("RGBA")
-    bg = background.convert("RGBA")
-    
-    # Make sure the images are the same size
-    if fg.size != bg.size:
-        logger.warning("Foreground and background sizes don't match. Resizing background.")
-        bg = bg.resize(fg.size, Image.LANCZOS)
-    
-    # Convert to numpy arrays for pixel-level processing
-    fg_array = np.array(fg, dtype=np.float32) / 255.0
-    bg_array = np.array(bg, dtype=np.float32) / 255.0
-      # Extract the RGB and Alpha channels
-    fg_rgb = fg_array[:, :, :3]
-    fg_alpha = fg_array[:, :, 3]
-    bg_rgb = bg_array[:, :, :3]
-    bg_alpha = bg_array[:, :, 3]
-    
-    # Create a 3D alpha for broadcasting (shape: height, width, 1)
-    fg_alpha_3d = fg_alpha[:, :, np.newaxis]
-    bg_alpha_3d = bg_alpha[:, :, np.newaxis]
-    
-    # Apply edge refinement similar to apply_levels_to_mask:
-    # This helps eliminate dark fringing by adjusting semi-transparent pixels
-    
-    # Values from image_utils.py for better edge control
-    black_point = 20   # Higher values make more pixels fully transparent (removes dark fringe)
-    mid_point = 128    # No change to midtones by default
-    white_point = 235  # Lower values make more pixels fully opaque (cleanup light fringe)
+    refined = np.arange(256, dtype=np.float32) / 255.0
+    refined = np.clip(refined, black_point/255.0, white_point/255.0)
+    refined = (refined - black_point/255.0) / max(0.001, (white_point - black_point)/255.0)
     
-    # Apply levels adjustment to alpha channel
-    refined_alpha = np.clip(fg_alpha, black_point/255.0, white_point/255.0)
-    refined_alpha = (refined_alpha - black_point/255.0) / max(0.001, (white_point - black_point)/255.0)
-    
-    # Apply gamma correction if needed
     if mid_point != 128:
-        gamma = 1.0
         if mid_point < 128:
             gamma = 1.0 + (128.0 - mid_point) / 128.0
         else:
             gamma = 128.0 / mid_point
-        refined_alpha = np.power(refined_alpha, 1.0/gamma)
-    
-    # Use the refined alpha for compositing
-    refined_alpha_3d = refined_alpha[:, :, np.newaxis]
-    
-    # Compute the output alpha with refined values
-    out_alpha = refined_alpha_3d + bg_alpha_3d * (1.0 - refined_alpha_3d)
-    
-    # Key step: Layer compositing with straight (non-premultiplied) alpha and refined edges
-    # This eliminates dark fringing by properly adjusting the alpha channel
-    out_rgb = fg_rgb * refined_alpha_3d + bg_rgb * (1.0 - refined_alpha_3d)
+        refined = np.power(refined, 1.0/gamma)
     
-    # Combine the RGB and Alpha channels
-    out_array = np.zeros((fg_array.shape[0], fg_array.shape[1], 4), dtype=np.float32)
-    out_array[:, :, :3] = out_rgb
-    out_array[:, :, 3] = np.squeeze(out_alpha)
-    
-    # Convert back to 8-bit values
-    out_array_8bit = (out_array * 255.0).astype(np.uint8)
+    refined = refined.astype(np.float32)
+    refined.flags.writeable = False
+    return refined
+
+@functools.lru_cache(maxsize=8)
+def _edge_alpha_lut(black_point, mid_point, white_point):
+    """
+    256-entry uint8 table mapping a foreground alpha straight to its refined blend weight:
+    the alpha left after pasting the foreground with itself as mask (a*a/255 with PIL's
+    rounding), then the levels curve of _levels_weight_lut. Read-only, memoized.
+    """
+    alpha = np.arange(256, dtype=np.uint32)
+    pasted = alpha * alpha + 128
+    pasted = (pasted + (pasted >> 8)) >> 8
+    refined = _levels_weight_lut(black_point, mid_point, white_point)[pasted]
+    lut = np.rint(refined * 255.0).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+def _scratch(name, shape, dtype):
+    """
+    Returns an uninitialized array of the given shape and dtype backed by the calling
+    thread's scratch buffer ``name``, growing that buffer when it is too small.
+    """
+    buffers = getattr(_SCRATCH, "buffers", None)
+    if buffers is None:
+        buffers = _SCRATCH.buffers = {}
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = buffers.get(name)
+    if buf is None or buf.nbytes < nbytes:
+        buf = buffers[name] = np.empty(nbytes, dtype=np.uint8)
+    return buf[:nbytes].view(dtype).reshape(shape)
+
+def composite_over_solid_color(fg_array, bg_rgb, out):
+    """
+    Blends an RGBA foreground straight onto an opaque solid color, writing into ``out``,
+    like a graphics program's layer compositing: the foreground is pasted with its own
+    alpha as mask, its edge alpha is refined with the EDGE_LEVELS curve, and the color is
+    blended with straight (non-premultiplied) alpha over the solid layer. All math is
+    8/16-bit fixed point; results are rounded.
     
-    # Create a PIL Image from the array
-    result = Image.fromarray(out_array_8bit, mode="RGBA")
+    Args:
+        fg_array (numpy.ndarray): HxWx4 uint8 foreground
+        bg_rgb (tuple): Background color as (r, g, b)
+        out (numpy.ndarray): HxWx4 uint8 destination, e.g. a view into the final canvas
+    """
+    alpha = fg_array[:, :, 3]
+    
+    # Fully opaque input (e.g. a photo without cutout): nothing to blend, the
+    # foreground color is the result
+    if alpha.min() == 255:
+        logger.debug("No-alpha fast path: copying foreground without blending")
+        out[:, :, :3] = fg_array[:, :, :3]
+        out[:, :, 3] = 255
+        return
+    
+    if njit is not None:
+        _composite_solid_kernel(fg_array, _edge_alpha_lut(*EDGE_LEVELS), *bg_rgb, out)
+        return
+    
+    # The full-size weight and masks live in per-thread scratch buffers (the canvas itself
+    # cannot be reused: the saved Image shares its memory and may still be saving)
+    weight = np.take(_edge_alpha_lut(*EDGE_LEVELS), alpha, out=_scratch("weight", alpha.shape, np.uint8), mode="clip")
+    out_rgb = out[:, :, :3]
+    
+    # Three cases: weight 0 shows only the background, alpha 255 only the foreground
+    # color itself, and only the band in between (the thin edge of a cutout) is blended
+    out_rgb[:] = bg_rgb
+    solid = np.equal(alpha, 255, out=_scratch("solid", alpha.shape, np.bool_))
+    np.copyto(out_rgb, fg_array[:, :, :3], where=solid[:, :, np.newaxis])
+    
+    # alpha 255 always maps to weight 255, so "weight != 0 and not solid" is an XOR
+    band = np.not_equal(weight, 0, out=_scratch("band", alpha.shape, np.bool_))
+    np.logical_xor(band, solid, out=band)
+    edge_rows, edge_cols = np.nonzero(band)
+    if edge_rows.size:
+        # Pasting with its own alpha as mask scales color by alpha
+        # (same rounding as PIL's paste: ((x + 128) + ((x + 128) >> 8)) >> 8)
+        # The band is gathered channel-major (3 x N, one contiguous row per channel) so
+        # every step below is a plain contiguous uint16 loop instead of a stride-3 one
+        rgb = fg_array[edge_rows, edge_cols, :3].T.astype(np.uint16, order="C")
+        rgb *= alpha[edge_rows, edge_cols]
+        rgb += 128
+        rgb += rgb >> 8
+        rgb >>= 8
+        
+        # Refined weight from the LUT, then round((fg*w + bg*(255-w)) / 255); at most 255*255
+        # before rounding, so everything stays in uint16
+        edge_weight = weight[edge_rows, edge_cols].astype(np.uint16)
+        rgb *= edge_weight
+        rgb += np.array(bg_rgb, dtype=np.uint16)[:, np.newaxis] * (255 - edge_weight)
+        rgb += 128
+        rgb += rgb >> 8
+        rgb >>= 8
+        out_rgb[edge_rows, edge_cols] = rgb.T
+    
+    # Background is opaque, so the result is always fully opaque
+    out[:, :, 3] = 255
+
+def _save_result(result, output_path):
+    save_png_atomic(result, output_path, compress_level=FINAL_PNG_COMPRESS_LEVEL)
+    logger.info(f"Saved image with solid background to {output_path}")
+
+def _finish_save(future):
+    """
+    Done-callback of a background save: logs and records a failure. Runs at most once per
+    future (flush_saves may call it too, before the executor has run the callback).
+    """
+    with _pending_saves_lock:
+        output_path = _pending_saves.pop(future, None)
+        if output_path is None:
+            return
+        error = future.exception()
+        if error is not None:
+            _failed_saves.append(output_path)
+    if error is not None:
+        logger.error(f"Error saving image with solid background to {output_path}: {str(error)}")
+
+def flush_saves():
+    """
+    Blocks until every save started by add_solid_background(background_save=True) has
+    finished. Failed saves are logged as soon as they fail.
     
-    return result
+    Returns:
+        list: Output paths of the saves that failed since the last flush (not on disk)
+    """
+    with _pending_saves_lock:
+        pending = list(_pending_saves)
+    for future in pending:
+        future.exception()  # waits without raising
+        _finish_save(future)
+    with _pending_saves_lock:
+        failed = list(_failed_saves)
+        _failed_saves.clear()
+    return failed
 
-def add_solid_background(image_path, output_path=None, bg_color=None, margin=None):
+def add_solid_background(image_path, output_path=None, bg_color=None, margin=None, background_save=False):
     """
     Adds a solid background to a transparent image with smart margins.
     Uses a graphics software-like layer composition approach for clean edges.
@@ -218,22 +395,26 @@ def add_solid_background(image_path, output_path=None, bg_color=None, margin=Non
         output_path (str, optional): Path to save the new image with background
         bg_color (str, optional): Background color in hex format (#RRGGBB)
         margin (int, optional): Maximum margin to add around the image
+        background_save (bool): Encode and write the PNG on a background thread and return
+            right away. The file only exists after flush_saves(), which also returns the
+            paths whose save failed; use this only when nothing reads output_path immediately.
         
     Returns:
         str: Path to the new image with background
     """
     try:
-        # Check if solid background is enabled
-        if not get_solid_bg_enabled():
+        # Check if solid background is enabled (all three settings come from one config lookup)
+        enabled, config_color, config_margin = get_solid_bg_settings()
+        if not enabled:
             logger.info("Solid background generation is disabled in config")
             return None
             
         # Use config values if not provided
         if bg_color is None:
-            bg_color = get_solid_bg_color()
+            bg_color = config_color
         
         if margin is None:
-            margin = get_solid_bg_margin()
+            margin = config_margin
         
         # Get the base directory and file name of the input image
         base_dir = os.path.dirname(image_path)
@@ -242,8 +423,7 @@ def add_solid_background(image_path, output_path=None, bg_color=None, margin=Non
         # Get pure file name without any suffixes
         if "_transparent" in file_name:
             # Extract timestamp ID if present
-            import re
-            timestamp_match = re.search(r'_transparent_(\d+)', file_name)
+            timestamp_match = _TRANSPARENT_RE.search(file_name)
             timestamp_id = timestamp_match.group(1) if timestamp_match else None
             file_name = file_name.replace("_transparent", "")
             # Remove timestamp if present
@@ -257,35 +437,40 @@ def add_solid_background(image_path, output_path=None, bg_color=None, margin=Non
             png_dir = os.path.join(base_dir, 'PNG')
         
         # Create timestamp-based identifier to prevent overwriting previous outputs
-        import time
         timestamp_id = int(time.time()) % 10000  # Use last 4 digits of timestamp
         
         # Try to extract timestamp ID from input file if it exists
         if "_transparent_" in image_path:
-            import re
-            match = re.search(r'_transparent_(\d+)', image_path)
+            match = _TRANSPARENT_RE.search(image_path)
             if match:
                 timestamp_id = match.group(1)
         
         # Always use the _transparent.png file from the PNG directory
         transparent_img_path = os.path.join(png_dir, f"{file_name}_transparent_{timestamp_id}.png")
+        found = os.path.exists(transparent_img_path)
         
         # If exact match with timestamp doesn't exist, try to find any transparent file for this image
-        if not os.path.exists(transparent_img_path):
+        if not found:
             # Try without the timestamp ID
             basic_transparent_path = os.path.join(png_dir, f"{file_name}_transparent.png")
             if os.path.exists(basic_transparent_path):
                 transparent_img_path = basic_transparent_path
+                found = True
             else:
-                # Try to find any transparent file with this base name
-                import glob
-                pattern = os.path.join(png_dir, f"{file_name}_transparent_*.png")
-                matches = glob.glob(pattern)
+                # Try to find any transparent file with this base name (one directory scan)
+                prefix = f"{file_name}_transparent_"
+                try:
+                    with os.scandir(png_dir) as entries:
+                        matches = sorted(entry.name for entry in entries
+                                         if entry.name.startswith(prefix) and entry.name.endswith(".png"))
+                except OSError:
+                    matches = []
                 if matches:
-                    transparent_img_path = matches[0]  # Use the first match
+                    transparent_img_path = os.path.join(png_dir, matches[0])  # Use the first match
+                    found = True
         
         # Check if the transparent image exists
-        if not os.path.exists(transparent_img_path):
+        if not found:
             logger.warning(f"Enhanced transparent image not found at {transparent_img_path}")
             # If we're already using a PNG file, use it as-is
             if image_path.lower().endswith('.png'):
@@ -303,15 +488,25 @@ def add_solid_background(image_path, output_path=None, bg_color=None, margin=Non
             output_path = os.path.join(png_dir, f"{file_name}_solid_background_{timestamp_id}.png")
         
         # Open the transparent image
-        orig_img = Image.open(transparent_img_path).convert("RGBA")
-        width, height = orig_img.size
+        # The transparent output is always a PNG: skip format probing, read the pixels
+        # (which also closes the file) and only convert if it is not RGBA already
+        orig_img = Image.open(transparent_img_path, formats=("PNG",))
+        orig_img.load()
+        if orig_img.mode != "RGBA":
+            orig_img = orig_img.convert("RGBA")
+        
+        # Pixels are copied into NumPy once; bounds and compositing both work on this array
+        # and the only conversion back is Image.fromarray of the final canvas
+        fg_array = np.asarray(orig_img)
+        del orig_img
+        height, width = fg_array.shape[:2]
         
         # Find the content bounds
-        content_bounds = get_content_bounds(orig_img)
+        content_bounds = get_content_bounds(fg_array)
         
         # Calculate smart margins
         left_margin, top_margin, right_margin, bottom_margin = calculate_smart_margins(
-            content_bounds, orig_img.size, margin
+            content_bounds, (width, height), margin
         )
         
         # Convert hex color to RGB
@@ -320,27 +515,42 @@ def add_solid_background(image_path, output_path=None, bg_color=None, margin=Non
         # Calculate dimensions with smart margins
         new_width = width + left_margin + right_margin
         new_height = height + top_margin + bottom_margin
-          # ----- GRAPHICS SOFTWARE-LIKE LAYER COMPOSITING APPROACH -----
+        # ----- GRAPHICS SOFTWARE-LIKE LAYER COMPOSITING APPROACH -----
         
-        # 1. Create a solid background layer (fully opaque)
-        solid_bg = Image.new("RGBA", (new_width, new_height), (*bg_rgb, 255))
+        # Content rectangle on the final canvas
+        left, top, right, bottom = content_bounds
+        x0, x1 = left_margin + left, left_margin + right
+        y0, y1 = top_margin + top, top_margin + bottom
         
-        # 2. Create a new transparent canvas for the foreground layer
-        fg_layer = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
+        # 1. Final canvas: only the area around the content rectangle is filled with the
+        # opaque background color, the rectangle itself is fully written by the blend below
+        bg_pixel = (*bg_rgb, 255)
+        canvas = np.empty((new_height, new_width, 4), dtype=np.uint8)
+        canvas[:y0] = bg_pixel
+        canvas[y1:] = bg_pixel
+        canvas[y0:y1, :x0] = bg_pixel
+        canvas[y0:y1, x1:] = bg_pixel
         
-        # 3. Place the transparent image onto the foreground layer at the proper position
-        # This ensures we have two completely separate layers
-        fg_layer.paste(orig_img, (left_margin, top_margin), orig_img)
-        
-        # 4. Composite the layers using the graphics software-like function
-        # This preserves RGB values and uses straight alpha with edge refinement
-        # to eliminate dark fringing that commonly occurs at transparent edges
-        logger.info("Applying edge refinement during compositing (levels: 20/128/235) to eliminate dark fringing")
-        result = composite_layers_like_graphics_software(fg_layer, solid_bg)
+        # 2-4. Blend the foreground directly into its rectangle on the canvas.
+        # Straight-alpha blend with the EDGE_LEVELS edge refinement (see composite_over_solid_color).
+        # Only the content bounds are blended: everything outside has alpha <= 5, which the
+        # 20 black point turns fully transparent, so those pixels stay pure background
+        logger.info("Applying edge refinement during compositing (levels: %d/%d/%d) to eliminate dark fringing" % EDGE_LEVELS)
+        composite_over_solid_color(
+            fg_array[top:bottom, left:right],
+            bg_rgb,
+            canvas[y0:y1, x0:x1]
+        )
+        result = Image.fromarray(canvas, mode="RGBA")
         
         # 5. Save the final composited image
-        result.save(output_path)
-        logger.info(f"Saved image with solid background to {output_path}")
+        if background_save:
+            future = _SAVE_POOL.submit(_save_result, result, output_path)
+            with _pending_saves_lock:
+                _pending_saves[future] = output_path
+            future.add_done_callback(_finish_save)
+        else:
+            _save_result(result, output_path)
         
         # INTELLIGENT CLEANUP: Check if this is the final operation and cleanup if needed
         logger.info("SOLID BG: Checking if intelligent cleanup should run after solid background...")
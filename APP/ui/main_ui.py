@@ -3,9 +3,9 @@
 from PySide6.QtCore import Qt, QSize
 import qtawesome as qta
 import os
-import json
 from PySide6.QtGui import QPixmap, QFont, QIcon
 from APP.helpers.image_support import get_supported_extensions
+from APP.helpers.config_manager import get_value
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel,
     QPushButton, QCheckBox, QSpinBox, QSlider, QGroupBox, QSplitter, QComboBox
@@ -16,6 +16,29 @@ from PySide6.QtGui import QAction
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton
 
 
+class _LazyDialog:
+    """Builds a dialog on first call and returns that same instance afterwards."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._dialog = None
+        self._on_create = []
+
+    def __call__(self):
+        if self._dialog is None:
+            self._dialog = self._factory()
+            for callback in self._on_create:
+                callback(self._dialog)
+        return self._dialog
+
+    def on_create(self, callback):
+        """Run callback(dialog) once the dialog exists (immediately if it already does)."""
+        if self._dialog is None:
+            self._on_create.append(callback)
+        else:
+            callback(self._dialog)
+
+
 def create_main_ui(parent):
     """Create and return the main UI layout."""
     central_widget = QWidget(parent)
@@ -118,21 +141,23 @@ def create_main_ui(parent):
         def set_current(self, text):
             self.combo.setCurrentText(text)
 
-    model_dialog = ModelDialog(parent)
+    # Dialogs are only built the first time their menu action is used
+    model_dialog = _LazyDialog(lambda: ModelDialog(parent))
 
     # About dialog
     class AboutDialog(QDialog):
+        # Icon pixmap, loaded once at its display size
+        _ICON_PIX = None
+
         def __init__(self, parent=None):
             super().__init__(parent)
             self.setWindowTitle('Tentang Keong-MAS')
             self.setModal(True)
             self.setFixedWidth(520)
 
-            # Load version from project config.json
-            config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.json')
-            with open(config_path, 'r', encoding='utf-8') as _cf:
-                cfg = json.load(_cf)
-            _app_version = cfg['app']['version']
+            # App info from project config.json (parsed once and cached by config_manager)
+            app_info = get_value('app', {})
+            _app_version = app_info['version']
 
             main_layout = QHBoxLayout(self)
             main_layout.setContentsMargins(16, 12, 16, 12)
@@ -147,14 +172,14 @@ def create_main_ui(parent):
 
             icon_label = QLabel()
             icon_label.setFixedSize(128, 128)
-            icon_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "APP", "res", "Keong-MAS.ico")
-            icon = QIcon(icon_path)
-            pix = icon.pixmap(QSize(256, 256))
-            if pix.isNull():
-                print(f"AboutDialog: icon not found at {icon_path}")
-            else:
-                pix = pix.scaled(128, 128, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                icon_label.setPixmap(pix)
+            if AboutDialog._ICON_PIX is None:
+                icon_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "APP", "res", "Keong-MAS.ico")
+                # Request the display size directly; QIcon picks the closest frame of the ICO
+                AboutDialog._ICON_PIX = QIcon(icon_path).pixmap(QSize(128, 128))
+                if AboutDialog._ICON_PIX.isNull():
+                    print(f"AboutDialog: icon not found at {icon_path}")
+            if not AboutDialog._ICON_PIX.isNull():
+                icon_label.setPixmap(AboutDialog._ICON_PIX)
             left_layout.addWidget(icon_label)
 
             main_layout.addWidget(left_frame)
@@ -177,9 +202,9 @@ def create_main_ui(parent):
             subtitle.setObjectName('subtitle')
             right_layout.addWidget(subtitle)
 
-            developer = cfg['app']['developer']
-            license_text = cfg['app']['license']
-            about_text = cfg['app']['about']
+            developer = app_info['developer']
+            license_text = app_info['license']
+            about_text = app_info['about']
 
             version_label = QLabel(f"Version: {_app_version}")
             version_label.setObjectName('versionLabel')
@@ -203,7 +228,7 @@ def create_main_ui(parent):
 
             self.adjustSize()
 
-    about_dialog = AboutDialog(parent)
+    about_dialog = _LazyDialog(lambda: AboutDialog(parent))
 
     ui_dict = {
         'drop_area_frame': drop_area,
@@ -319,6 +344,38 @@ def _create_split_view():
     return splitter
 
 
+def _make_checkbox(text, name, tooltip):
+    """Create a named checkbox with a tooltip."""
+    checkbox = QCheckBox(text)
+    checkbox.setObjectName(name)
+    checkbox.setToolTip(tooltip)
+    return checkbox
+
+
+def _make_button(text, name, tooltip, size=None, height=None):
+    """Create a named push button; size gives a fixed square, height a fixed height."""
+    button = QPushButton(text)
+    button.setObjectName(name)
+    button.setToolTip(tooltip)
+    if size is not None:
+        button.setFixedSize(size, size)
+    if height is not None:
+        button.setFixedHeight(height)
+    return button
+
+
+def _make_spinbox(name, minimum, maximum, value, width, tooltip):
+    """Create a named, fixed-size (width x 22) spin box."""
+    spin = QSpinBox()
+    spin.setObjectName(name)
+    spin.setRange(minimum, maximum)
+    spin.setValue(value)
+    spin.setFixedWidth(width)
+    spin.setFixedHeight(22)
+    spin.setToolTip(tooltip)
+    return spin
+
+
 def _create_controls():
     """Create the bottom control panel."""
     container = QWidget()
@@ -330,31 +387,13 @@ def _create_controls():
     row1 = QHBoxLayout()
     row1.setSpacing(6)
     
-    mask_cb = QCheckBox("Simpan Mask")
-    mask_cb.setObjectName('saveMaskCheckBox')
-    mask_cb.setToolTip("Simpan file mask yang sudah disesuaikan")
-    row1.addWidget(mask_cb)
-    
-    jpg_cb = QCheckBox("Ekspor JPG")
-    jpg_cb.setObjectName('jpgExportCheckBox')
-    jpg_cb.setToolTip("Ekspor versi JPG (tanpa transparansi)")
-    row1.addWidget(jpg_cb)
-    
-    crop_cb = QCheckBox("Potong Otomatis")
-    crop_cb.setObjectName('checkBox')
-    crop_cb.setToolTip("Potong gambar otomatis sesuai konten")
-    row1.addWidget(crop_cb)
-    
-    solid_cb = QCheckBox("BG Solid")
-    solid_cb.setObjectName('solidBgCheckBox')
-    solid_cb.setToolTip("Tambahkan background solid")
-    row1.addWidget(solid_cb)
-    
-    color_btn = QPushButton()
-    color_btn.setObjectName('colorPickerButton')
-    color_btn.setFixedSize(20, 20)
-    color_btn.setToolTip("Pilih warna background")
-    row1.addWidget(color_btn)
+    mask_cb = _make_checkbox("Simpan Mask", 'saveMaskCheckBox', "Simpan file mask yang sudah disesuaikan")
+    jpg_cb = _make_checkbox("Ekspor JPG", 'jpgExportCheckBox', "Ekspor versi JPG (tanpa transparansi)")
+    crop_cb = _make_checkbox("Potong Otomatis", 'checkBox', "Potong gambar otomatis sesuai konten")
+    solid_cb = _make_checkbox("BG Solid", 'solidBgCheckBox', "Tambahkan background solid")
+    color_btn = _make_button("", 'colorPickerButton', "Pilih warna background", size=20)
+    for widget in (mask_cb, jpg_cb, crop_cb, solid_cb, color_btn):
+        row1.addWidget(widget)
     
     row1.addSpacing(10)
     
@@ -362,13 +401,7 @@ def _create_controls():
     margin_label.setFixedWidth(45)
     row1.addWidget(margin_label)
     
-    margin_spin = QSpinBox()
-    margin_spin.setObjectName('unifiedMarginSpinBox')
-    margin_spin.setRange(0, 1000)
-    margin_spin.setValue(10)
-    margin_spin.setFixedWidth(50)
-    margin_spin.setFixedHeight(22)
-    margin_spin.setToolTip("Margin untuk pemotongan dan background")
+    margin_spin = _make_spinbox('unifiedMarginSpinBox', 0, 1000, 10, 50, "Margin untuk pemotongan dan background")
     row1.addWidget(margin_spin)
     
     row1.addSpacing(10)
@@ -378,13 +411,7 @@ def _create_controls():
     quality_label.setFixedWidth(50)
     row1.addWidget(quality_label)
     
-    quality_spin = QSpinBox()
-    quality_spin.setObjectName('jpgQualitySpinBox')
-    quality_spin.setRange(1, 100)
-    quality_spin.setValue(90)
-    quality_spin.setFixedWidth(45)
-    quality_spin.setFixedHeight(22)
-    quality_spin.setToolTip("Kualitas ekspor JPG (1-100)")
+    quality_spin = _make_spinbox('jpgQualitySpinBox', 1, 100, 90, 45, "Kualitas ekspor JPG (1-100)")
     row1.addWidget(quality_spin)
 
     # Always-on-top checkbox, placed next to quality controls (persisted)
@@ -404,50 +431,22 @@ def _create_controls():
     row2 = QHBoxLayout()
     row2.setSpacing(6)
     
-    stop_btn = QPushButton()
-    stop_btn.setObjectName('stopButton')
-    stop_btn.setToolTip("Hentikan proses")
-    stop_btn.setFixedSize(28, 28)
-    row2.addWidget(stop_btn)
-    
-    repeat_btn = QPushButton()
-    repeat_btn.setObjectName('repeatButton')
-    repeat_btn.setToolTip("Ulangi proses terakhir")
-    repeat_btn.setFixedSize(28, 28)
-    row2.addWidget(repeat_btn)
-    
-    reset_btn = QPushButton()
-    reset_btn.setObjectName('resetButton')
-    reset_btn.setToolTip("Reset dan kembali ke DND area")
-    reset_btn.setFixedSize(28, 28)
+    stop_btn = _make_button("", 'stopButton', "Hentikan proses", size=28)
+    repeat_btn = _make_button("", 'repeatButton', "Ulangi proses terakhir", size=28)
+    reset_btn = _make_button("", 'resetButton', "Reset dan kembali ke DND area", size=28)
     reset_btn.hide()  # Hidden until files loaded
-    row2.addWidget(reset_btn)
+    for widget in (stop_btn, repeat_btn, reset_btn):
+        row2.addWidget(widget)
     
     row2.addSpacing(10)
     
-    open_folder_btn = QPushButton(" Buka Folder")
-    open_folder_btn.setObjectName('openFolder')
-    open_folder_btn.setFixedHeight(28)
-    open_folder_btn.setToolTip("Pilih folder untuk diproses")
-    row2.addWidget(open_folder_btn)
-    
-    open_files_btn = QPushButton(" Pilih File")
-    open_files_btn.setObjectName('openFiles')
-    open_files_btn.setFixedHeight(28)
-    open_files_btn.setToolTip("Pilih file gambar untuk diproses")
-    row2.addWidget(open_files_btn)
-    
-    output_btn = QPushButton(" Folder Output")
-    output_btn.setObjectName('outputLocationButton')
-    output_btn.setToolTip("Pilih lokasi output (kosongkan untuk default: folder PNG)")
-    output_btn.setFixedHeight(28)
-    row2.addWidget(output_btn)
-    
-    clear_output_btn = QPushButton("×")
-    clear_output_btn.setObjectName('clearOutputButton')
-    clear_output_btn.setToolTip("Reset ke folder output default (PNG)")
-    clear_output_btn.setFixedSize(28, 28)
-    row2.addWidget(clear_output_btn)
+    open_folder_btn = _make_button(" Buka Folder", 'openFolder', "Pilih folder untuk diproses", height=28)
+    open_files_btn = _make_button(" Pilih File", 'openFiles', "Pilih file gambar untuk diproses", height=28)
+    output_btn = _make_button(" Folder Output", 'outputLocationButton',
+                              "Pilih lokasi output (kosongkan untuk default: folder PNG)", height=28)
+    clear_output_btn = _make_button("×", 'clearOutputButton', "Reset ke folder output default (PNG)", size=28)
+    for widget in (open_folder_btn, open_files_btn, output_btn, clear_output_btn):
+        row2.addWidget(widget)
 
     # Model selection combobox placed near the right side (left of WA button)
     model_label = QLabel("Model:")
@@ -477,10 +476,7 @@ def _create_controls():
 
     row2.addStretch()
     
-    whatsapp_btn = QPushButton(" WA Grup")
-    whatsapp_btn.setObjectName('whatsappButton')
-    whatsapp_btn.setFixedHeight(28)
-    whatsapp_btn.setToolTip("Buka grup WhatsApp Keong-MAS")
+    whatsapp_btn = _make_button(" WA Grup", 'whatsappButton', "Buka grup WhatsApp Keong-MAS", height=28)
     row2.addWidget(whatsapp_btn)
     
     main_layout.addLayout(row2)
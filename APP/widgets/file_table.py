@@ -1,12 +1,27 @@
 """File table widget with status tracking."""
 
 import os
-from PySide6.QtCore import Qt, Signal
-from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
-from PySide6.QtGui import QColor
+from PySide6.QtCore import Qt, Signal, QRect
+from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QStyledItemDelegate
+from PySide6.QtGui import QColor, QBrush
 import qtawesome as qta
 
 
+class StatusRowDelegate(QStyledItemDelegate):
+    """Delegate yang memberi warna latar baris sesuai status file (tanpa setBackground per sel)."""
+    
+    PROCESSING_BRUSH = QBrush(QColor(255, 255, 0, 13))  # Yellow with 0.05 opacity
+    
+    def __init__(self, table):
+        super().__init__(table)
+        self._table = table
+        
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if self._table.get_file_status(index.row()) == 'processing':
+            option.backgroundBrush = self.PROCESSING_BRUSH
+
+
 class FileTableWidget(QTableWidget):
     """Table widget untuk menampilkan daftar file dengan status."""
     
@@ -20,10 +35,23 @@ class FileTableWidget(QTableWidget):
         'failed': ('fa5s.times-circle', '#F44336'),
     }
     
+    # Satuan ukuran file dan pangkat 1024 yang sesuai (lihat _format_size)
+    _SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+    _SIZE_POWERS = (1, 1024, 1024 ** 2, 1024 ** 3, 1024 ** 4)
+    
+    # status -> QIcon, dirender sekali saat pertama dipakai lalu dipakai ulang
+    _ICON_CACHE = {}
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self._setup_table()
-        self.file_data = {}  # row_index -> file_info dict
+        # Data per baris disimpan sebagai list paralel (index = row)
+        self._ids = []
+        self._paths = []
+        self._names = []
+        self._sizes = []
+        self._statuses = []
+        self.setItemDelegate(StatusRowDelegate(self))
         
     def _setup_table(self):
         """Setup table properties."""
@@ -44,26 +72,50 @@ class FileTableWidget(QTableWidget):
         self.itemSelectionChanged.connect(self._on_selection_changed)
         self.itemDoubleClicked.connect(self._on_double_click)
         
-    def add_file(self, file_path, file_id=None):
-        """Add file to table."""
+    def add_file(self, file_path, file_id=None, *, file_size=None):
+        """Add file to table. Pass file_size when it is already known to skip the stat."""
         row = self.rowCount()
         self.insertRow(row)
+        self._fill_row(row, file_path, file_id, file_size)
         
-        file_name = os.path.basename(file_path)
+    def add_files(self, file_paths, file_ids=None, file_sizes=None):
+        """Add many files at once: one resize of the table and a single repaint."""
+        if not file_paths:
+            return
+        if file_ids is None:
+            file_ids = [None] * len(file_paths)
+        if file_sizes is None:
+            file_sizes = [None] * len(file_paths)
+        
+        start = self.rowCount()
+        self.setUpdatesEnabled(False)
         try:
-            file_size = os.path.getsize(file_path)
+            self.setRowCount(start + len(file_paths))
+            for offset, (file_path, file_id, file_size) in enumerate(zip(file_paths, file_ids, file_sizes)):
+                self._fill_row(start + offset, file_path, file_id, file_size)
+        finally:
+            self.setUpdatesEnabled(True)
+        
+    def _fill_row(self, row, file_path, file_id, file_size=None):
+        """Fill an existing (empty) row with a file's data."""
+        file_name = os.path.basename(file_path)
+        if file_size is None:
+            try:
+                file_size = os.path.getsize(file_path)
+            except:
+                file_size = None
+        if file_size is not None:
             size_str = self._format_size(file_size)
-        except:
+        else:
             file_size = 0
             size_str = "N/A"
         
-        self.file_data[row] = {
-            'file_id': file_id,
-            'file_path': file_path,
-            'file_name': file_name,
-            'file_size': file_size,
-            'status': 'pending'
-        }
+        # Rows are always filled in order at the end of the table
+        self._ids.append(file_id)
+        self._paths.append(file_path)
+        self._names.append(file_name)
+        self._sizes.append(file_size)
+        self._statuses.append('pending')
         
         no_item = QTableWidgetItem(str(row + 1))
         no_item.setTextAlignment(Qt.AlignCenter)
@@ -77,8 +129,7 @@ class FileTableWidget(QTableWidget):
         self.setItem(row, 2, size_item)
         
         status_item = QTableWidgetItem()
-        icon_name, color = self.STATUS_ICONS['pending']
-        status_item.setIcon(qta.icon(icon_name, color=color))
+        status_item.setIcon(self._get_status_icon('pending'))
         status_item.setTextAlignment(Qt.AlignCenter)
         self.setItem(row, 3, status_item)
         
@@ -87,40 +138,46 @@ class FileTableWidget(QTableWidget):
         if row < 0 or row >= self.rowCount():
             return
             
-        self.file_data[row]['status'] = status
+        self._statuses[row] = status
         
         status_item = self.item(row, 3)
         if status in self.STATUS_ICONS:
-            icon_name, color = self.STATUS_ICONS[status]
-            status_item.setIcon(qta.icon(icon_name, color=color))
-        
-        if status == 'processing':
-            for col in range(self.columnCount()):
-                item = self.item(row, col)
-                if item:
-                    item.setBackground(QColor(255, 255, 0, 13))  # Yellow with 0.05 opacity
-        else:
-            for col in range(self.columnCount()):
-                item = self.item(row, col)
-                if item:
-                    item.setBackground(QColor(255, 255, 255, 0))  # Transparent
+            status_item.setIcon(self._get_status_icon(status))
+        
+        # Row tint comes from StatusRowDelegate; only this row needs repainting
+        self.viewport().update(QRect(0, self.rowViewportPosition(row), self.viewport().width(), self.rowHeight(row)))
+        
+    @classmethod
+    def _get_status_icon(cls, status):
+        """Get the cached icon for a status, rendering it on first use."""
+        icon = cls._ICON_CACHE.get(status)
+        if icon is None:
+            icon_name, color = cls.STATUS_ICONS[status]
+            icon = cls._ICON_CACHE[status] = qta.icon(icon_name, color=color)
+        return icon
         
     def clear_all(self):
         """Clear all files from table."""
         self.setRowCount(0)
-        self.file_data.clear()
+        self._ids.clear()
+        self._paths.clear()
+        self._names.clear()
+        self._sizes.clear()
+        self._statuses.clear()
     
     def get_file_path(self, row):
         """Get file path for a specific row."""
-        return self.file_data.get(row, {}).get('file_path', '')
+        return self._paths[row] if 0 <= row < len(self._paths) else ''
+    
+    def get_file_status(self, row):
+        """Get status of a specific row."""
+        return self._statuses[row] if 0 <= row < len(self._statuses) else ''
     
     def _format_size(self, size):
         """Format file size to human readable."""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        # Unit index straight from the bit length: every 10 bits is one step of 1024
+        idx = min(max(size.bit_length() - 1, 0) // 10, 4)
+        return f"{size / self._SIZE_POWERS[idx]:.1f} {self._SIZE_UNITS[idx]}"
     
     def _on_selection_changed(self):
         """Handle selection change."""
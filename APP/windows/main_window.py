@@ -29,7 +29,7 @@ from APP.helpers.config_manager import (
     get_output_location, set_output_location,
     get_levels_black_point, set_levels_black_point,
     get_levels_mid_point, set_levels_mid_point,
-    get_levels_white_point, set_levels_white_point,
+    get_levels_white_point, set_levels_white_point, set_levels_points,
     get_selected_model, set_selected_model
 )
 
@@ -43,6 +43,10 @@ with open(CONFIG_PATH, 'r', encoding='utf-8') as _cfg_f:
     _cfg = json.load(_cfg_f)
 APP_VERSION = _cfg['app']['version']
 
+# Levels slider: how long the slider must be idle before the values are saved and
+# the mask preview is recomputed (labels still follow every tick)
+LEVELS_DEBOUNCE_MS = 80
+
 
 class MaskWorker(QObject):
     """Worker to generate mask from a raw original image using rembg in background."""
@@ -85,48 +89,24 @@ class MaskWorker(QObject):
             import rembg
             self.progress.emit(20, "Memproses: Menghapus latar belakang (mask)...")
 
-            # Detect GPU availability and prefer CUDA if available
-            gpu_available = False
+            # Use the provider gpu_fix validated once per process (lazy, memoized) instead of
+            # importing onnxruntime and building a throwaway CUDA session for every preview
             try:
-                import onnxruntime as ort
-                available_providers = ort.get_available_providers()
-                
-                # Check if CUDA provider is listed as available
-                if 'CUDAExecutionProvider' in available_providers:
-                    # Try to actually create a session with CUDA to verify it works
-                    try:
-                        import rembg
-                        # Try creating a session with a known model and CUDA provider
-                        test_session = rembg.new_session('isnet-general-use', providers=['CUDAExecutionProvider'])
-                        # Check if CUDA is actually being used (not just CPU fallback)
-                        if hasattr(test_session, '_sess') and hasattr(test_session._sess, 'get_providers'):
-                            used_providers = test_session._sess.get_providers()
-                            if 'CUDAExecutionProvider' in used_providers:
-                                gpu_available = True
-                    except Exception:
-                        gpu_available = False
+                from APP.helpers.gpu_fix import get_provider_list, with_provider_options
+                providers = with_provider_options(get_provider_list())
             except Exception:
-                gpu_available = False
+                providers = []
 
             # Prefer direct session if model prepared
             session = None
             try:
                 if self.model_name:
-                    if gpu_available:
-                        session = rembg.new_session(self.model_name, providers=['CUDAExecutionProvider'])
-                    else:
-                        session = rembg.new_session(self.model_name)
+                    session = rembg.new_session(self.model_name, providers=providers) if providers else rembg.new_session(self.model_name)
                 elif prepared:
-                    if gpu_available:
-                        session = rembg.new_session(prepared, providers=['CUDAExecutionProvider'])
-                    else:
-                        session = rembg.new_session(prepared)
+                    session = rembg.new_session(prepared, providers=providers) if providers else rembg.new_session(prepared)
             except Exception:
                 try:
-                    if gpu_available:
-                        session = rembg.new_session(providers=['CUDAExecutionProvider'])
-                    else:
-                        session = rembg.new_session()
+                    session = rembg.new_session(providers=providers) if providers else rembg.new_session()
                 except Exception:
                     session = None
 
@@ -215,9 +195,11 @@ class MainWindow(QMainWindow):
             if hasattr(self.ui, 'actionExit') and self.ui.actionExit:
                 self.ui.actionExit.triggered.connect(self.close)
 
-            # If model dialog exists, forward its selection to the main model combo
-            if hasattr(self.ui, 'modelDialog') and getattr(self.ui.modelDialog, 'combo', None) is not None:
-                self.ui.modelDialog.combo.currentTextChanged.connect(lambda text: self.ui.modelComboBox.setCurrentText(text))
+            # If model dialog exists, forward its selection to the main model combo once it is built
+            if hasattr(self.ui, 'modelDialog'):
+                self.ui.modelDialog.on_create(
+                    lambda dialog: dialog.combo.currentTextChanged.connect(lambda text: self.ui.modelComboBox.setCurrentText(text))
+                )
 
             # If About menu WA action exists, connect
             if hasattr(self.ui, 'actionWAGroup') and self.ui.actionWAGroup:
@@ -657,6 +639,11 @@ class MainWindow(QMainWindow):
         
         # Multi-handle slider for levels
         if hasattr(self.ui, 'levelsMultiSlider') and self.ui.levelsMultiSlider:
+            self._pending_levels = None
+            self._levels_commit_timer = QTimer(self)
+            self._levels_commit_timer.setSingleShot(True)
+            self._levels_commit_timer.setInterval(LEVELS_DEBOUNCE_MS)
+            self._levels_commit_timer.timeout.connect(self._commit_levels)
             self.ui.levelsMultiSlider.valuesChanged.connect(self._on_levels_changed)
 
         if hasattr(self.ui, 'configureMaskButton') and self.ui.configureMaskButton:
@@ -896,24 +883,45 @@ class MainWindow(QMainWindow):
             print(f"Error saving white point: {str(e)}")
 
     def _on_levels_changed(self, black, mid, white):
-        """Handler for combined levels changes from the multi-handle slider."""
-        try:
-            set_levels_black_point(int(black))
-            set_levels_mid_point(int(mid))
-            set_levels_white_point(int(white))
+        """Handler for combined levels changes from the multi-handle slider.
+        
+        Labels are updated on every tick; saving and the mask preview are debounced
+        so a drag writes the config and recomputes the preview once, not per tick.
+        """
+        if hasattr(self.ui, 'blackPointValue'):
+            self.ui.blackPointValue.setText(str(int(black)))
+        if hasattr(self.ui, 'midPointValue'):
+            self.ui.midPointValue.setText(str(int(mid)))
+        if hasattr(self.ui, 'whitePointValue'):
+            self.ui.whitePointValue.setText(str(int(white)))
+
+        self._pending_levels = (black, mid, white)
+        if getattr(self, '_levels_commit_timer', None) is not None:
+            self._levels_commit_timer.start()
+        else:
+            self._commit_levels()
 
-            if hasattr(self.ui, 'blackPointValue'):
-                self.ui.blackPointValue.setText(str(int(black)))
-            if hasattr(self.ui, 'midPointValue'):
-                self.ui.midPointValue.setText(str(int(mid)))
-            if hasattr(self.ui, 'whitePointValue'):
-                self.ui.whitePointValue.setText(str(int(white)))
+    def _commit_levels(self, update_preview=True):
+        """Save the latest slider levels and refresh the mask preview."""
+        if getattr(self, '_pending_levels', None) is None:
+            return
+        black, mid, white = self._pending_levels
+        self._pending_levels = None
+        try:
+            set_levels_points(black, mid, white)
 
             # Realtime update mask preview if in mask mode
-            self._update_mask_preview_if_needed()
+            if update_preview:
+                self._update_mask_preview_if_needed()
         except Exception as e:
             print(f"Error saving levels: {str(e)}")
 
+    def _flush_pending_levels(self, update_preview=True):
+        """Save a still-debounced levels change right away (before processing or closing)."""
+        if getattr(self, '_levels_commit_timer', None) is not None:
+            self._levels_commit_timer.stop()
+        self._commit_levels(update_preview=update_preview)
+
     def _update_mask_preview_if_needed(self):
         """Update mask preview in realtime if in mask mode."""
         if not getattr(self.image_preview, 'mask_mode', False):
@@ -1243,6 +1251,7 @@ class MainWindow(QMainWindow):
                 pass
 
             model_name = self.ui.modelComboBox.currentText() if hasattr(self.ui, 'modelComboBox') and self.ui.modelComboBox else None
+            self._flush_pending_levels(update_preview=False)
             self._mask_worker = MaskWorker(chosen, temp_dir, model_name=model_name)
             self._mask_thread = QThread()
             self._mask_worker.moveToThread(self._mask_thread)
@@ -1801,9 +1810,10 @@ class MainWindow(QMainWindow):
             return
 
         models = [self.ui.modelComboBox.itemText(i) for i in range(self.ui.modelComboBox.count())]
-        self.ui.modelDialog.set_models(models)
-        self.ui.modelDialog.set_current(self.ui.modelComboBox.currentText())
-        self.ui.modelDialog.exec()
+        model_dialog = self.ui.modelDialog()
+        model_dialog.set_models(models)
+        model_dialog.set_current(self.ui.modelComboBox.currentText())
+        model_dialog.exec()
 
     def _show_about_dialog(self):
         """Show the About dialog; WA button opens the group link (uses existing _open_whatsapp)."""
@@ -1813,7 +1823,7 @@ class MainWindow(QMainWindow):
         if not hasattr(self.ui, 'aboutDialog'):
             print("About dialog not available in UI")
             return
-        self.ui.aboutDialog.exec()
+        self.ui.aboutDialog().exec()
     
     def _on_output_location_clicked(self):
         """Handle output location button click."""
@@ -1964,8 +1974,7 @@ class MainWindow(QMainWindow):
         print("Output location cleared - using default PNG folder")
     
     def _open_whatsapp(self):
-        config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.json')
-        with open(config_path, 'r', encoding='utf-8') as cf:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as cf:
             cfg = json.load(cf)
         link = cfg['app']['wa_group_link']
         webbrowser.open(link)
@@ -2071,15 +2080,20 @@ class MainWindow(QMainWindow):
         self.file_table.clear_all()
         self.file_id_map.clear()
         
+        file_ids = []
+        file_sizes = []  # None = size unknown, the table shows N/A
         for idx, file_path in enumerate(file_paths):
             try:
                 file_size = os.path.getsize(file_path)
+                file_sizes.append(file_size)
             except:
                 file_size = 0
+                file_sizes.append(None)
             
             file_id = self.db.add_file(self.current_session_id, file_path, file_size)
-            self.file_table.add_file(file_path, file_id)
+            file_ids.append(file_id)
             self.file_id_map[idx] = file_id
+        self.file_table.add_files(file_paths, file_ids, file_sizes)
         
         # Auto select first row to show preview
         if self.file_table.rowCount() > 0:
@@ -2099,6 +2113,9 @@ class MainWindow(QMainWindow):
         if hasattr(self.ui, 'repeatButton') and self.ui.repeatButton:
             self.ui.repeatButton.setEnabled(False)
         
+        # The worker reads the levels from config; don't let it miss a debounced slider change
+        self._flush_pending_levels()
+        
         self.worker = RemBgWorker(file_paths, output_dir=output_dir)
         self.thread = QThread()
         self.worker.moveToThread(self.thread)
@@ -2293,6 +2310,7 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Save current model selection on close to ensure persistence. Reset levels_enabled to False."""
+        self._flush_pending_levels(update_preview=False)
         try:
             if hasattr(self.ui, 'modelComboBox') and self.ui.modelComboBox:
                 current = self.ui.modelComboBox.currentText()
@@ -2468,6 +2486,7 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Handle window close event to save current model selection, abort workers, and clean temp files."""
+        self._flush_pending_levels(update_preview=False)
         try:
             if hasattr(self.ui, 'modelComboBox') and self.ui.modelComboBox:
                 current_model = self.ui.modelComboBox.currentText()
@@ -10,12 +10,15 @@ from PySide6.QtCore import QObject, Signal
 from APP.helpers import model_manager
 from APP.helpers.config_manager import (
     get_save_mask_enabled, get_auto_crop_enabled, get_unified_margin, get_solid_bg_enabled,
-    get_selected_model, get_levels_black_point, get_levels_mid_point, get_levels_white_point
+    get_selected_model, get_levels_black_point, get_levels_mid_point, get_levels_white_point,
+    get_model_cpu_int8_enabled, get_jpg_export_enabled
 )
 
-from APP.helpers.image_utils import enhance_transparency_with_levels, cleanup_original_temp_files
+from APP.helpers.image_utils import (
+    enhance_transparency_with_levels, cleanup_original_temp_files, INTERMEDIATE_PNG_COMPRESS_LEVEL
+)
 from APP.helpers.image_crop import crop_transparent_image
-from APP.helpers.solid_background import add_solid_background
+from APP.helpers.solid_background import add_solid_background, flush_saves
 from APP.helpers.jpg_converter import process_jpg_conversion
 
 
@@ -41,6 +44,7 @@ class RemBgWorker(QObject):
         self.start_time = 0
         self.processed_files_count = 0
         self.temp_files_to_cleanup = []  # Track temporary PNG files for cleanup
+        self._sessions = {}  # rembg sessions reused across the images of this run
         
         # Ensure CUDA/cuDNN paths are available for this worker thread using the shared helper
         try:
@@ -63,8 +67,8 @@ class RemBgWorker(QObject):
         Prioritizes: CUDA > DML > ROCm > CPU.
         """
         try:
-            from APP.helpers.gpu_fix import get_provider_list
-            return get_provider_list()
+            from APP.helpers.gpu_fix import get_provider_list, with_provider_options
+            return with_provider_options(get_provider_list())
         except Exception:
             return []
 
@@ -104,6 +108,14 @@ class RemBgWorker(QObject):
                 processed += 1
                 self.progress.emit(int(processed / total_files * 100), f"Selesai: {processed}/{total_files}", None)
         
+        # Solid background PNGs may still be encoding in the background
+        failed_saves = flush_saves()
+        if failed_saves:
+            self.status_update.emit(
+                f"Gagal menyimpan {len(failed_saves)} gambar solid background: "
+                + ", ".join(os.path.basename(p) for p in failed_saves)
+            )
+        
         processing_time = time.time() - self.start_time
         self.finished.emit(processing_time, self.processed_files_count)
         
@@ -166,7 +178,7 @@ class RemBgWorker(QObject):
                     img = img.convert('RGB')
                 
                 # Save as PNG with high quality (PNG will not carry EXIF orientation tags)
-                img.save(temp_png_path, 'PNG', optimize=False)
+                img.save(temp_png_path, 'PNG', optimize=False, compress_level=INTERMEDIATE_PNG_COMPRESS_LEVEL)
             
             # Track for cleanup
             self.temp_files_to_cleanup.append(temp_png_path)
@@ -228,19 +240,24 @@ class RemBgWorker(QObject):
             
             self.progress.emit(50, f"Menyimpan gambar transparan...", image_path)
             
-            # _enhance_transparency returns (enhanced_path, adjusted_mask_path)
-            enhanced_path, adjusted_mask_path = self._enhance_transparency(output_path, mask_path, file_name, base_output_dir, image_path)
+            # _enhance_transparency returns (enhanced_path, adjusted_mask_path, enhanced_image)
+            enhanced_path, adjusted_mask_path, enhanced_image = self._enhance_transparency(output_path, mask_path, file_name, base_output_dir, image_path)
             
             if enhanced_path:
                 print(f"✓ PNG transparan berhasil dibuat: {enhanced_path}")
                 
+                # Auto crop rewrites the PNG on disk, so the in-memory image is only
+                # reusable for JPG export when cropping is off
+                if get_auto_crop_enabled():
+                    enhanced_image = None
+                
                 # Auto crop PNG (independen dari JPG export)
                 # Pass adjusted_mask_path so auto crop can use it, then cleanup if needed
                 enhanced_path = self._apply_auto_crop(enhanced_path, adjusted_mask_path, image_path)
                 print(f"✓ Selesai proses auto crop (jika diaktifkan)")
                 
                 # Solid background & JPG export (opsional)
-                self._apply_solid_background(enhanced_path, image_path)
+                self._apply_solid_background(enhanced_path, image_path, enhanced_image)
             
             # Emit completion with ORIGINAL input path, not output path
             self.file_completed.emit(image_path)
@@ -281,16 +298,16 @@ class RemBgWorker(QObject):
                     # Prefer creating session using the actual ONNX file path if available
                     model_file = None
                     try:
-                        model_file = os.path.join(model_manager.MODEL_DIR, model_manager.MODEL_FILENAMES.get(model_name, f"{model_name}.onnx"))
+                        model_file = model_manager.get_model_file_path(model_name)
                     except Exception:
                         model_file = None
 
                     # Use a local variable inside this nested function to avoid UnboundLocalError
                     selected_model_name = model_name
                     
-                    # Check if CUDA/other GPU providers are available and report details
-                    gpu_available = False
-                    providers = []
+                    # Report GPU/provider details. get_provider_list only returns providers that
+                    # gpu_fix already validated with a real session (once per process), so no
+                    # throwaway test session is built here for every image
                     try:
                         providers = self._get_providers()
                         try:
@@ -300,54 +317,44 @@ class RemBgWorker(QObject):
                             gpu_names = []
 
                         if providers:
-                            try:
-                                # Use already-imported rembg from outer scope to create a test session
-                                test_session = rembg.new_session('isnet-general-use', providers=providers)
-
-                                # Inspect providers from the test session safely (different rembg versions expose providers differently)
-                                session_provs = None
-                                if hasattr(test_session, 'get_providers'):
-                                    try:
-                                        session_provs = test_session.get_providers()
-                                    except Exception:
-                                        session_provs = None
-                                elif hasattr(test_session, '_sess') and hasattr(test_session._sess, 'get_providers'):
-                                    try:
-                                        session_provs = test_session._sess.get_providers()
-                                    except Exception:
-                                        session_provs = None
-                                elif hasattr(test_session, 'session') and hasattr(test_session.session, 'get_providers'):
-                                    try:
-                                        session_provs = test_session.session.get_providers()
-                                    except Exception:
-                                        session_provs = None
-                                else:
-                                    try:
-                                        print(f"Test session object: {type(test_session)}, some attrs: {sorted([a for a in dir(test_session) if not a.startswith('__')])[:12]}")
-                                    except Exception:
-                                        pass
-
-                                print(f"GPU terdeteksi: {', '.join(gpu_names) if gpu_names else 'Tidak diketahui'}; ONNX providers: {providers}; test session providers: {session_provs if session_provs is not None else 'unknown'}. Akan mencoba menggunakan {providers[0]} untuk inference.")
-
-                                # Consider CUDA available only if the session actually reports using CUDA
-                                if session_provs and 'CUDAExecutionProvider' in session_provs:
-                                    gpu_available = True
-                                else:
-                                    gpu_available = False
-
-                            except Exception as e:
-                                print(f"Provider ONNX {providers} terdeteksi tetapi pembuatan sesi uji gagal: {type(e).__name__}: {e}. Akan fallback ke CPU.")
-                                gpu_available = False
+                            # Entries may be (name, options) tuples; only the names are logged
+                            provider_names = [p[0] if isinstance(p, tuple) else p for p in providers]
+                            print(f"GPU terdeteksi: {', '.join(gpu_names) if gpu_names else 'Tidak diketahui'}; ONNX providers: {provider_names}. Akan mencoba menggunakan {provider_names[0]} untuk inference.")
                         else:
                             print(f"Tidak ditemukan provider ONNX GPU. GPU sistem: {', '.join(gpu_names) if gpu_names else 'Tidak ada'}. Menggunakan CPU.")
                     except Exception as e:
                         print(f"Pemeriksaan GPU gagal: {e}. Menggunakan CPU.")
                     
+                    # Sessions are reused across the images of a run: building one loads the ONNX
+                    # graph and initializes the provider, which dominates the per-image cost
+                    session_key = (selected_model_name, get_model_cpu_int8_enabled())
+                    cached_session = self._sessions.get(session_key)
+                    
+                    # Opt-in: on CPU, run the INT8-quantized copy through rembg's custom-model session.
+                    # Only models whose pre/post-processing matches that session qualify; others stay FP32
+                    int8_session = None
+                    custom_session = model_manager.get_int8_custom_session(selected_model_name)
+                    if cached_session is None and not providers and session_key[1] and custom_session is None:
+                        print(f"Model {selected_model_name} tidak didukung dalam mode INT8, memakai model FP32")
+                    elif cached_session is None and not providers and session_key[1]:
+                        quantized_path = model_manager.get_quantized_model_path(selected_model_name)
+                        if quantized_path:
+                            try:
+                                int8_session = rembg.new_session(custom_session, model_path=quantized_path)
+                                print(f"Menggunakan model INT8: {os.path.basename(quantized_path)}")
+                            except Exception as e_int8:
+                                print(f"Session INT8 gagal ({e_int8}), memakai model FP32")
+                    
                     try:
                         # First try creating session by model name (preferred)
                         providers = self._get_providers()
-                        print(f"Mencoba membuat session dengan model name: {selected_model_name} (providers={providers})...")
-                        session = rembg.new_session(selected_model_name, providers=providers) if providers else rembg.new_session(selected_model_name)
+                        if cached_session is not None:
+                            session = cached_session
+                        elif int8_session is not None:
+                            session = int8_session
+                        else:
+                            print(f"Mencoba membuat session dengan model name: {selected_model_name} (providers={providers})...")
+                            session = rembg.new_session(selected_model_name, providers=providers) if providers else rembg.new_session(selected_model_name)
                     except Exception as e_name:
                         print(f"Session by name failed for {selected_model_name}: {str(e_name)}")
 
@@ -410,6 +417,7 @@ class RemBgWorker(QObject):
                                 pass
 
                     # If we reach here, session was created successfully — inspect which provider(s) are actually used
+                    self._sessions[session_key] = session
                     session_provs = None
                     try:
                         # Try several attribute paths to query providers to support different rembg/ort versions
@@ -608,7 +616,7 @@ class RemBgWorker(QObject):
                         print(f"PERINGATAN: Ukuran output tidak normal! Menyesuaikan ukuran...")
                         output_img = output_img.resize(input_size, Image.LANCZOS)
                     
-                    output_img.save(output_path)
+                    output_img.save(output_path, compress_level=INTERMEDIATE_PNG_COMPRESS_LEVEL)
                     
                     # Always get mask separately as required
                     output_mask = rembg.remove(input_img, only_mask=True, session=session)
@@ -617,7 +625,7 @@ class RemBgWorker(QObject):
                         print(f"PERINGATAN: Ukuran mask tidak sama dengan input! Menyesuaikan ukuran...")
                         output_mask = output_mask.resize(input_size, Image.LANCZOS)
                     
-                    output_mask.save(mask_path)
+                    output_mask.save(mask_path, compress_level=INTERMEDIATE_PNG_COMPRESS_LEVEL)
                     result_queue.put((output_img, output_mask, True))
                     
                 except Exception as e:
@@ -664,7 +672,7 @@ class RemBgWorker(QObject):
         """Enhance transparency using levels adjustment.
         
         Returns:
-            tuple: (enhanced_path, adjusted_mask_path) or (None, None) on error
+            tuple: (enhanced_path, adjusted_mask_path, enhanced_image) or (None, None, None) on error
         """
         try:
             self.progress.emit(70, f"Menghasilkan gambar transparan yang disempurnakan...", image_path)
@@ -681,6 +689,10 @@ class RemBgWorker(QObject):
             self.progress.emit(80, f"Membuat gambar transparan dengan mask yang diatur levels...", image_path)
             print(f"Langkah 2: Membuat gambar transparan dengan mask yang sudah diatur levels-nya...")
             
+            # The adjusted mask file is only needed for auto crop or when the user keeps masks;
+            # otherwise skip encoding it altogether
+            save_adjusted_mask = save_mask or get_auto_crop_enabled()
+            
             # enhance_transparency_with_levels now returns (enhanced_path, adjusted_mask_path)
             result = enhance_transparency_with_levels(
                 output_path, mask_path,
@@ -688,18 +700,13 @@ class RemBgWorker(QObject):
                 black_point=black_point,
                 mid_point=mid_point,
                 white_point=white_point,
-                save_adjusted_mask=True,
+                save_adjusted_mask=save_adjusted_mask,
                 cleanup_temp_files_after=False,
-                save_mask=save_mask
+                save_mask=save_mask,
+                return_image=True
             )
             
-            # Handle return value (could be tuple or single value for backwards compatibility)
-            if isinstance(result, tuple):
-                enhanced_path, adjusted_mask_path = result
-            else:
-                # Backwards compatibility: if only path returned
-                enhanced_path = result
-                adjusted_mask_path = None
+            enhanced_path, adjusted_mask_path, enhanced_image = result
             
             if enhanced_path:
                 print(f"Berhasil membuat gambar dengan levels adjustment: {enhanced_path}")
@@ -707,15 +714,15 @@ class RemBgWorker(QObject):
                 
                 cleanup_original_temp_files(output_path, mask_path)
                 # Return both paths - mask will be cleaned up later after auto crop (if needed)
-                return enhanced_path, adjusted_mask_path
+                return enhanced_path, adjusted_mask_path, enhanced_image
             
-            return None, None
+            return None, None, None
             
         except Exception as e:
             print(f"Error saat membuat gambar transparan: {str(e)}")
             import traceback
             traceback.print_exc()
-            return None, None
+            return None, None, None
 
     def _apply_auto_crop(self, enhanced_path, adjusted_mask_path, image_path):
         """Apply auto-cropping if enabled. Works on PNG directly, independent of JPG export.
@@ -792,19 +799,30 @@ class RemBgWorker(QObject):
         
         return enhanced_path
 
-    def _apply_solid_background(self, enhanced_path, image_path):
-        """Apply solid background and JPG export if enabled."""
+    def _apply_solid_background(self, enhanced_path, image_path, enhanced_image=None):
+        """Apply solid background and JPG export if enabled.
+        
+        enhanced_image, when given, holds the current pixels of enhanced_path and is
+        reused for JPG export if no solid background image is produced.
+        """
         try:
             unified_margin = get_unified_margin()
             solid_bg_path = None
             
             if get_solid_bg_enabled():
-                solid_bg_path = add_solid_background(enhanced_path, margin=unified_margin)
+                # Without JPG export nothing reads the solid background PNG again, so it can be
+                # written while the next image is processed (flushed in process_files)
+                solid_bg_path = add_solid_background(
+                    enhanced_path, margin=unified_margin, background_save=not get_jpg_export_enabled()
+                )
                 if solid_bg_path:
                     print(f"Image with solid background saved at: {solid_bg_path} (margin: {unified_margin}px)")
             
             try:
-                jpg_path = process_jpg_conversion(solid_bg_path if solid_bg_path else enhanced_path)
+                if solid_bg_path:
+                    jpg_path = process_jpg_conversion(solid_bg_path)
+                else:
+                    jpg_path = process_jpg_conversion(enhanced_path, pil_image=enhanced_image)
                 if jpg_path:
                     print(f"JPG version saved at: {jpg_path}")
             except Exception as e: